@@ -1,14 +1,23 @@
 # TIDES/main.py
 import argparse
+import json
 import logging
 from pathlib import Path
+import threading
 import time
 from typing import Dict, Any
 
 from src.utils.config import ConfigManager
 from src.utils.model_manager import ModelManager
+from src.utils.response_cache import ResponseCache
+from src.utils.rate_limiter import get_rate_limiter
+from src.utils.checkpoint import check_fresh_run, check_manifest, pending_indices, result_path, run_id_for, write_manifest
+from src.utils.result_store import RESULTS_DB, ResultStore
+from src.utils.scheduler import run_ordered
 from src.evaluation.evaluator import ResponseEvaluator
 from src.retrieval.retriever import get_retriever
+from src.retrieval.retrieval_cache import RetrievalCache
+from src.retrieval.tokenizer import tokenizer_key
 from src.data.dataset_utils import DatasetLoader
 
 def setup_logging(output_dir: Path) -> None:
@@ -39,70 +48,157 @@ def parse_arguments():
    
    parser.add_argument('--model-name', type=str,
                      help='Specific model name (optional)')
-   parser.add_argument('--retriever', choices=['tfidf', 'cosine'], default='tfidf',
+   parser.add_argument('--retriever', choices=['tfidf', 'cosine', 'bm25', 'inverted', 'dense', 'hybrid'], default='tfidf',
                      help='Document retrieval method')
+   parser.add_argument('--top-k', type=int,
+                     help='Number of retrieved documents passed to the LLM stages')
+   parser.add_argument('--cache-mode', choices=['readwrite', 'readonly', 'bypass'],
+                     help='LLM response cache mode (overrides model.cache.mode)')
    parser.add_argument('--config', type=str,
                      help='Path to custom config file')
    parser.add_argument('--output-dir', type=str,
                      help='Custom output directory')
    parser.add_argument('--batch-size', type=int, default=1,
-                     help='Batch size for processing')
+                     help='Number of questions processed concurrently')
    parser.add_argument('--start-idx', type=int, default=0,
                      help='Starting index for processing')
    parser.add_argument('--end-idx', type=int,
                      help='Ending index for processing')
+   parser.add_argument('--resume', action='store_true',
+                     help='Skip questions that already have a valid result in the output directory')
    
    return parser.parse_args()
 
 def process_dataset(args: argparse.Namespace, config: Dict[str, Any]):
+   response_cache = None
+   result_store = None
    try:
+       cache_config = config['model'].get('cache') or {}
+       if cache_config.get('mode', 'bypass') != 'bypass':
+           response_cache = ResponseCache(
+               cache_config['path'],
+               mode=cache_config['mode'],
+               max_entries=cache_config.get('max_entries'),
+               max_bytes=cache_config.get('max_bytes')
+           )
+       rate_limits = (config['model'].get('rate_limits') or {}).get(args.model_type) or {}
        model_manager = ModelManager(
            model_type=args.model_type,
            api_key=args.api_key,
-           model_name=args.model_name
+           model_name=args.model_name,
+           cache=response_cache,
+           rate_limiter=get_rate_limiter(
+               args.model_type,
+               rate_limits.get('requests_per_minute'),
+               rate_limits.get('tokens_per_minute')
+           ),
+           backoff_base=config['model'].get('backoff_base', 1.0),
+           backoff_max=config['model'].get('backoff_max', 60.0),
+           max_in_flight=config['model'].get('max_in_flight')
        )
        
-       retriever = get_retriever(args.retriever)
-       evaluator = ResponseEvaluator(model_manager, args.dataset)
+       index_dir = None
+       if config['retrieval'].get('persist_index') and args.dataset != 'techqa':
+           # TechQA candidate sets change per question, so only the manual corpora are worth persisting
+           index_dir = Path(config['data']['base_path']) / 'processed' / args.dataset / 'index'
+       retriever_options = dict(config['retrieval'].get(args.retriever) or {})
+       if args.retriever == 'hybrid':
+           retriever_options.setdefault('dense', config['retrieval'].get('dense'))
+       retriever = get_retriever(
+           args.retriever,
+           index_dir=index_dir,
+           tokenizer=config['retrieval'].get('tokenizer', 'regex'),
+           cache_dir=index_dir,
+           **retriever_options
+       )
+       evaluator = ResponseEvaluator(model_manager, args.dataset, config.get('evaluation'))
        dataset_loader = DatasetLoader(config)
        
-       dataset = dataset_loader.load_dataset(args.dataset)
-       questions = dataset['questions'][args.start_idx:args.end_idx]
+       dataset = dataset_loader.load_dataset(args.dataset, lazy=config['data'].get('lazy', False))
+       save_dir = Path(config['output']['save_dir'])
+       run_id = run_id_for(config, args.dataset, model_manager)
+       if config['output'].get('results_store', 'sqlite') == 'sqlite':
+           result_store = ResultStore(
+               save_dir / RESULTS_DB,
+               commit_every=config['output'].get('commit_every', 16),
+               sync=config['output'].get('sync', 'normal')
+           )
+       indices = list(range(len(dataset['questions'])))[args.start_idx:args.end_idx]
+       if args.resume:
+           check_manifest(save_dir, config, args.dataset, model_manager)
+           total = len(indices)
+           indices = pending_indices(save_dir, indices, result_store, run_id)
+           logging.info(f"Resuming: {total - len(indices)} of {total} questions already done")
+       elif result_store is None:
+           check_fresh_run(save_dir, config, args.dataset, model_manager)
+       write_manifest(save_dir, config, args.dataset, model_manager)
+       # Keep only this run's questions; a lazily loaded dataset streams the rest past
+       wanted = set(indices)
+       questions = {idx: question for idx, question in enumerate(dataset['questions']) if idx in wanted}
+       
+       batch_retrievals = {}
+       if args.dataset != 'techqa' and indices:
+           # Manual questions share one corpus, so score them all with a single sparse product
+           queries = [questions[idx]['question'] for idx in indices]
+           if config['retrieval'].get('cache', True):
+               retrieval_cache = RetrievalCache(
+                   Path(config['data']['base_path']) / 'processed' / args.dataset / 'retrieval' / f'{args.retriever}.npz',
+                   RetrievalCache.make_key(dataset['documents'], {
+                       'retriever': args.retriever,
+                       'tokenizer': tokenizer_key(config['retrieval'].get('tokenizer', 'regex')),
+                       'options': retriever_options
+                   })
+               )
+               retrievals = retrieval_cache.retrieve_batch(retriever, queries, dataset['documents'], config['retrieval']['top_k'])
+           else:
+               retrievals = retriever.retrieve_batch(queries, dataset['documents'], config['retrieval']['top_k'])
+           batch_retrievals = dict(zip(indices, retrievals))
        
-       for idx, question in enumerate(questions, start=args.start_idx):
+       retrieval_lock = threading.Lock()
+       
+       def process_question(idx):
+           question = questions[idx]
            try:
                logging.info(f"Processing question {idx}")
                
                if args.dataset == 'techqa':
                    docs = dataset_loader.load_documents(question['doc_ids'])
-                   retrieved_docs = retriever.retrieve_documents(
-                       question['title'] + ' ' + question['body'],
-                       docs,
-                       config['retrieval']['top_k']
-                   )
+                   # The retriever refits its index per TechQA candidate set, so keep that step serial
+                   with retrieval_lock:
+                       retrieved_docs = retriever.retrieve_documents(
+                           question['title'] + ' ' + question['body'],
+                           docs,
+                           config['retrieval']['top_k']
+                       )
                else:
-                   retrieved_docs = retriever.retrieve_documents(
-                       question['question'],
-                       dataset['documents'],
-                       config['retrieval']['top_k']
-                   )
+                   retrieved_docs = batch_retrievals[idx]
                
-               result = evaluator.evaluate(
+               return evaluator.evaluate(
                    question['question'] if args.dataset in ['s10','smart_tv_remote'] else question['title'] + ' ' + question['body'],
                    docs if args.dataset == 'techqa' else dataset['documents'],
                    retrieved_docs
                )
                
-               output_path = Path(config['output']['save_dir']) / f'result_{idx:03d}.json'
-               evaluator.save_results(result, output_path)
-               
            except Exception as e:
                logging.error(f"Error processing question {idx}: {str(e)}")
-               continue
+               return None
+       
+       if result_store is not None:
+           sink = lambda idx, result: result_store.append(run_id, idx, result)
+       else:
+           sink = lambda idx, result: evaluator.save_results(result, result_path(save_dir, idx))
+       written = run_ordered(indices, process_question, sink, max_workers=args.batch_size)
+       logging.info(f"Wrote {written} of {len(indices)} results")
                
    except Exception as e:
        logging.error(f"Error in process_dataset: {str(e)}")
        raise
+   finally:
+       if result_store is not None:
+           result_store.close()
+       if response_cache is not None:
+           logging.info(f"LLM response cache: {response_cache.stats()}")
+           response_cache.close()
 
 def main():
    args = parse_arguments()
@@ -124,27 +220,28 @@ def main():
        process_dataset(args, config)
        logging.info("Processing completed successfully!")
 
-        logging.info("Starting evaluation...")
-        metrics_calculator = MetricsCalculator()
-        
-        if args.dataset == 'techqa':
-            metrics = metrics_calculator.evaluate_techqa(
-                output_dir=output_dir,
-                reference_dir='data/raw/techqa/TechQA/validation'
-            )
-        else:
-            metrics = metrics_calculator.evaluate_manual(
-                output_dir=output_dir,
-                dataset_type=args.dataset
-            )
-            
-        metrics_path = output_dir / 'metrics.json'
-        with open(metrics_path, 'w') as f:
-            json.dump(metrics, f, indent=2)
-            
-        logging.info("Evaluation Results:")
-        for metric, value in metrics.items():
-            logging.info(f"{metric}: {value:.2f}")
+       logging.info("Starting evaluation...")
+       from src.evaluation.metrics import MetricsCalculator
+       metrics_calculator = MetricsCalculator(config.get('metrics'))
+   
+       if args.dataset == 'techqa':
+           metrics = metrics_calculator.evaluate_techqa(
+               output_dir=output_dir,
+               reference_dir='data/raw/techqa/TechQA/validation'
+           )
+       else:
+           metrics = metrics_calculator.evaluate_manual(
+               output_dir=output_dir,
+               dataset_type=args.dataset
+           )
+       
+       metrics_path = output_dir / 'metrics.json'
+       with open(metrics_path, 'w') as f:
+           json.dump(metrics, f, indent=2)
+       
+       logging.info("Evaluation Results:")
+       for metric, value in metrics.items():
+           logging.info(f"{metric}: {value:.2f}")
    except Exception as e:
        logging.error(f"Error in main process: {str(e)}")
        raise
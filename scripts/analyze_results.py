@@ -1,28 +1,38 @@
 # TIDES/scripts/analyze_results.py
+import argparse
 import json
+import sys
 import pandas as pd
 from pathlib import Path
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def load_results(results_dir):
-    results = []
-    results_dir = Path(results_dir)
-    for result_file in sorted(results_dir.glob('*.json')):
-        with open(result_file, 'r') as f:
-            results.append(json.load(f))
-    return results
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.result_store import iter_run_results
+
+def load_results(results_dir, run_id=None):
+    """Stream results from the run's results store (or legacy result_NNN.json files)."""
+    for _, result in iter_run_results(results_dir, run_id):
+        yield result
 
-def analyze_results(results_dir):
+def analyze_results(results_dir, run_id=None):
     """Analyze results"""
-    results = load_results(results_dir)
-    
+    results = []
     stats = {
-        'total_queries': len(results),
-        'avg_time': sum(r['time'] for r in results) / len(results),
-        'retrieval_success': sum(1 for r in results if r['stage1']),
-        'answer_success': sum(1 for r in results if r['stage3'] != 'No answer')
+        'total_queries': 0,
+        'avg_time': 0,
+        'retrieval_success': 0,
+        'answer_success': 0
     }
+    total_time = 0
+    for r in load_results(results_dir, run_id):
+        stats['total_queries'] += 1
+        total_time += r['total_time']
+        stats['retrieval_success'] += 1 if r['stage1'] else 0
+        stats['answer_success'] += 1 if r['stage3'] != 'No answer' else 0
+        results.append(r)
+    stats['avg_time'] = total_time / stats['total_queries'] if stats['total_queries'] else 0
     
     df = pd.DataFrame(results)
     
@@ -36,9 +46,11 @@ def main():
                       help='Directory containing result files')
     parser.add_argument('--output-dir', default='analysis',
                       help='Directory for analysis outputs')
+    parser.add_argument('--run-id',
+                      help='Run to analyze when the results store holds several (default: the manifest run)')
     args = parser.parse_args()
     
-    stats, df = analyze_results(args.results_dir)
+    stats, df = analyze_results(args.results_dir, args.run_id)
     print("Analysis Results:")
     print(json.dumps(stats, indent=2))
     
@@ -0,0 +1,82 @@
+# TIDES/scripts/benchmark_metrics.py
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s'
+    )
+
+def make_pairs(num_pairs, seed=0):
+    """Synthetic answer-like prediction/reference pairs with partial word overlap."""
+    rng = random.Random(seed)
+    vocab = [f'word{i}' for i in range(2000)] + ['the', 'a', 'to', 'of', 'and', 'is', 'in', 'press', 'menu', 'settings']
+    predictions, references = [], []
+    for _ in range(num_pairs):
+        reference = rng.choices(vocab, k=rng.randint(5, 60))
+        prediction = [word if rng.random() < 0.6 else rng.choice(vocab) for word in reference]
+        prediction += rng.choices(vocab, k=rng.randint(0, 40))
+        predictions.append(' '.join(prediction) + rng.choice(['.', '!', '']))
+        references.append(' '.join(reference).capitalize())
+    return predictions, references
+
+def baseline_scores(predictions, references):
+    """Per-pair scores the way the pipeline originally computed them."""
+    from rouge_score import rouge_scorer
+
+    scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'])
+    results = []
+    for pred, ref in zip(predictions, references):
+        token_f1 = None
+        if pred != "-" and ref != "-":
+            pred_tokens, ref_tokens = pred.split(), ref.split()
+            common = set(pred_tokens) & set(ref_tokens)
+            precision = len(common) / len(pred_tokens) if pred_tokens else 0
+            recall = len(common) / len(ref_tokens) if ref_tokens else 0
+            token_f1 = 2 * (precision * recall) / (precision + recall) if precision + recall > 0 else 0
+        rouge = scorer.score(ref, pred)
+        results.append({'token_f1': token_f1, **{key: tuple(score) for key, score in rouge.items()}})
+    return results
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark token F1 / ROUGE throughput against the rouge_score baseline')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 50000],
+                      help='Numbers of prediction/reference pairs')
+    parser.add_argument('--processes', type=int, default=None,
+                      help='Worker processes for large sets (default: all cores)')
+    parser.add_argument('--skip-baseline-above', type=int, default=50000,
+                      help='Only time the baseline up to this many pairs')
+    args = parser.parse_args()
+    setup_logging()
+
+    from src.evaluation.lexical_metrics import LexicalMetrics
+
+    serial = LexicalMetrics(processes=1)
+    parallel = LexicalMetrics(processes=args.processes, parallel_threshold=0)
+    for size in args.sizes:
+        predictions, references = make_pairs(size)
+        serial_scores, serial_time = timed(serial.score, predictions, references)
+        parallel_scores, parallel_time = timed(parallel.score, predictions, references)
+        line = (f"{size:>7} pairs: serial {size / serial_time:>9.0f} pairs/s, "
+                f"parallel {size / parallel_time:>9.0f} pairs/s")
+        if size <= args.skip_baseline_above:
+            expected, baseline_time = timed(baseline_scores, predictions, references)
+            if serial_scores != expected or parallel_scores != expected:
+                raise AssertionError(f"Lexical metrics differ from the rouge_score baseline at {size} pairs")
+            line += f", baseline {size / baseline_time:>9.0f} pairs/s (scores identical)"
+        logging.info(line)
+
+if __name__ == '__main__':
+    main()
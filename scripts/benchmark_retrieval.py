@@ -0,0 +1,117 @@
+# TIDES/scripts/benchmark_retrieval.py
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s'
+    )
+
+def benchmark_method(method, questions, documents, top_k, repeats):
+    from src.retrieval.retriever import get_retriever
+
+    retriever = get_retriever(method)
+    start = time.perf_counter()
+    retriever.build_index(documents)
+    build_time = time.perf_counter() - start
+
+    single_times, batch_times = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for question in questions:
+            retriever.retrieve_documents(question, documents, top_k)
+        single_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        retriever.retrieve_batch(questions, documents, top_k)
+        batch_times.append(time.perf_counter() - start)
+
+    return {
+        'build_s': build_time,
+        'per_query_ms': min(single_times) / len(questions) * 1000,
+        'batch_ms': min(batch_times) * 1000
+    }
+
+def check_inverted(questions, documents, top_k):
+    """Raise unless the pruned inverted index returns the exhaustive TF-IDF top_k (ties may reorder)."""
+    import numpy as np
+    from src.retrieval.retriever import InvertedIndexRetriever, TFIDFRetriever
+
+    exhaustive, pruned = TFIDFRetriever(), InvertedIndexRetriever()
+    exhaustive.build_index(documents)
+    pruned.build_index(documents)
+    full_scores = exhaustive.score_queries(questions, documents)
+    expected = exhaustive.retrieve_batch(questions, documents, top_k)
+    actual = pruned.retrieve_batch(questions, documents, top_k)
+    for question, scores, want, got in zip(questions, full_scores, expected, actual):
+        # Indices may differ only between equally scored documents, so compare the exhaustive scores they map to
+        if (len(got['indices']) != len(want['indices'])
+                or not np.allclose(got['scores'], want['scores'])
+                or not np.allclose(scores[got['indices']], want['scores'])):
+            raise AssertionError(f"Inverted index top-{top_k} differs from exhaustive TF-IDF for {question!r}")
+
+def check_hybrid(questions, documents, top_k):
+    """Raise if a hybrid result ranks a document that neither retriever actually matched.
+
+    Adds the corpus's rarest term as a query, so at least one query has fewer lexical
+    hits than pool_depth and its lexical list is padded with zero-score documents.
+    """
+    import numpy as np
+    from src.retrieval.hybrid import HybridRetriever
+
+    hybrid = HybridRetriever()
+    hybrid.build_index(documents)
+    doc_freq = np.diff(hybrid.lexical.term_matrix.indptr)
+    rare_term = hybrid.lexical.vectorizer.get_feature_names_out()[np.argmin(np.where(doc_freq > 0, doc_freq, np.inf))]
+    queries = list(questions) + [str(rare_term)]
+    depth = max(top_k, hybrid.pool_depth)
+    lexical = hybrid.lexical.retrieve_batch(queries, documents, depth)
+    dense = hybrid.dense.retrieve_batch(queries, documents, depth)
+    results = hybrid.retrieve_batch(queries, documents, top_k)
+    for query, result, lex, den in zip(queries, results, lexical, dense):
+        matched = {idx for hits in (lex, den) for idx, score in zip(hits['indices'], hits['scores']) if score > 0}
+        fused = {idx for idx, score in zip(result['indices'], result['scores']) if score > 0}
+        if not fused <= matched:
+            raise AssertionError(f"Hybrid top-{top_k} for {query!r} ranks unmatched documents {sorted(fused - matched)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark TIDES retrievers on the manual datasets')
+    parser.add_argument('--datasets', nargs='+', default=['s10', 'smart_tv_remote'],
+                      choices=['s10', 'smart_tv_remote'], help='Datasets to benchmark')
+    parser.add_argument('--methods', nargs='+', default=['tfidf', 'bm25', 'inverted'],
+                      help='Retrieval methods to compare')
+    parser.add_argument('--data-dir', default='data',
+                      help='Base data directory')
+    parser.add_argument('--top-k', type=int, default=30,
+                      help='Documents retrieved per question')
+    parser.add_argument('--repeats', type=int, default=3,
+                      help='Timing repeats (best run is reported)')
+    args = parser.parse_args()
+    setup_logging()
+
+    from src.data.dataset_utils import DatasetLoader
+
+    loader = DatasetLoader({'data': {'base_path': args.data_dir}})
+    for dataset_type in args.datasets:
+        dataset = loader.load_dataset(dataset_type)
+        questions = [question['question'] for question in dataset['questions']]
+        logging.info(f"{dataset_type}: {len(questions)} questions, {len(dataset['documents'])} sections")
+        if 'inverted' in args.methods:
+            check_inverted(questions, dataset['documents'], args.top_k)
+            logging.info(f"  inverted: top-{args.top_k} matches exhaustive TF-IDF on every question")
+        if 'hybrid' in args.methods:
+            check_hybrid(questions, dataset['documents'], args.top_k)
+            logging.info(f"    hybrid: every fused top-{args.top_k} document is a lexical or dense hit")
+        for method in args.methods:
+            stats = benchmark_method(method, questions, dataset['documents'], args.top_k, args.repeats)
+            logging.info(f"  {method:>8}: build {stats['build_s']:.3f} s, "
+                         f"{stats['per_query_ms']:.3f} ms/query, batch of {len(questions)} {stats['batch_ms']:.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# TIDES/scripts/benchmark_startup.py
+import argparse
+import logging
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+# Modules that must stay off the startup path; each is imported on demand by the code that needs it
+HEAVY_MODULES = ('together', 'openai', 'sklearn', 'nltk', 'torch', 'transformers',
+                 'bert_score', 'evaluate', 'rouge_score', 'pandas')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s [%(levelname)s] %(message)s'
+    )
+
+def import_profile(module):
+    """{module: (self_us, cumulative_us)} from one fresh interpreter run with -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            profile[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure TIDES cold-start import time with -X importtime')
+    parser.add_argument('--module', default='main',
+                      help='Entry module to import')
+    parser.add_argument('--repeats', type=int, default=5,
+                      help='Fresh interpreter runs (fastest is reported)')
+    parser.add_argument('--top', type=int, default=10,
+                      help='Slowest modules (self time) to list')
+    parser.add_argument('--max-ms', type=float,
+                      help='Fail if the entry import takes longer than this')
+    args = parser.parse_args()
+    setup_logging()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeats)]
+    best = min(profiles, key=lambda profile: profile[args.module][1])
+    total_ms = best[args.module][1] / 1000
+    logging.info(f"import {args.module}: {total_ms:.1f} ms (best of {args.repeats})")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        logging.info(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    heavy = sorted({name.split('.')[0] for name in best} & set(HEAVY_MODULES))
+    if heavy:
+        logging.error(f"Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.max_ms is not None and total_ms > args.max_ms:
+        logging.error(f"Startup import time {total_ms:.1f} ms exceeds the {args.max_ms:.1f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 # TIDES/scripts/preprocess_data.py
 import argparse
 import json
+import sys
 import pandas as pd
 from pathlib import Path
 import logging
@@ -9,6 +10,9 @@ import nltk
 from nltk.corpus import stopwords
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+sys.path.append(str(Path(__file__).parent.parent))
+from src.data.corpus_store import CorpusStore
+
 def setup_logging():
     logging.basicConfig(
         level=logging.INFO,
@@ -28,18 +32,14 @@ def preprocess_techqa(raw_dir: Path, processed_dir: Path):
         with open(technotes_path, 'r', encoding='utf-8') as f:
             technotes = json.load(f)
             
-        doc_dir = processed_dir / 'document_val'
-        doc_dir.mkdir(parents=True, exist_ok=True)
-        
-        for item in tqdm(validation_data, desc="Processing validation data"):
-            for doc_id in item['DOC_IDS']:
-                if doc_id in technotes:
-                    doc_path = doc_dir / f'{doc_id}.json'
-                    with open(doc_path, 'w', encoding='utf-8') as f:
-                        json.dump({
-                            'id': doc_id,
-                            'text': technotes[doc_id]['text']
-                        }, f, indent=2, ensure_ascii=False)
+        def referenced_technotes():
+            # Each technote is written once, however many questions reference it
+            for item in tqdm(validation_data, desc="Processing validation data"):
+                for doc_id in item['DOC_IDS']:
+                    if doc_id in technotes:
+                        yield doc_id, technotes[doc_id]['text']
+        
+        CorpusStore.build(referenced_technotes(), processed_dir / 'corpus_val')
         
         logging.info("TechQA preprocessing completed!")
         
@@ -175,7 +175,7 @@ def main():
     
     if args.dataset == 'techqa':
         preprocess_techqa(raw_dir / 'techqa', processed_dir / 'techqa')
-    elif args.dataset == ' smart_tv_remote':
+    elif args.dataset == 'smart_tv_remote':
         preprocess_smart_tv_remote(raw_dir / 'smart_tv_remote', processed_dir / 'smart_tv_remote')
         
         with open(processed_dir / 'smart_tv_remote/smart_tv_remote_corpus_processed.json', 'r') as f:
@@ -1,10 +1,13 @@
 # TIDES/scripts/run_experiment.py
 import argparse
 import json
+import sys
 from pathlib import Path
 import logging
 from datetime import datetime
 
+sys.path.append(str(Path(__file__).parent.parent))
+
 def setup_logging(output_dir):
     log_dir = Path(output_dir) / 'logs'
     log_dir.mkdir(parents=True, exist_ok=True)
@@ -22,35 +25,17 @@ def setup_logging(output_dir):
     )
 
 def run_experiment(args):
-    from src.utils.config import load_config
-    from src.utils.model_manager import ModelManager
-    from src.evaluation.evaluator import ResponseEvaluator
-    from src.retrieval.retriever import TFIDFRetriever, CosineRetriever
-    from src.data.dataset_utils import DatasetLoader
+    from src.utils.config import ConfigManager
+    from main import process_dataset
 
-    config = load_config(args)
-    setup_logging(config['data']['output_dir'])
+    config = ConfigManager(args).get_config()
+    setup_logging(config['output']['save_dir'])
     
     logging.info(f"Starting experiment with config: {config}")
     
     try:
-        model_manager = ModelManager(
-            model_type=args.model_type,
-            api_key=args.api_key,
-            model_name=args.model_name
-        )
-        
-        retriever = TFIDFRetriever() if args.retriever == 'tfidf' else CosineRetriever()
-        evaluator = ResponseEvaluator(model_manager, args.dataset)
-        dataset_loader = DatasetLoader(config)
-        
-        if args.dataset == 'techqa':
-            process_techqa(args, config, model_manager, evaluator, retriever, dataset_loader)
-        elif args.dataset == 'smart_tv_remote':
-            process_smart_tv_remote(args, config, model_manager, evaluator, retriever, dataset_loader)
-        else:
-            process_s10(args, config, model_manager, evaluator, retriever, dataset_loader)
-            
+        # --batch-size questions run concurrently through the shared pipeline in main.py
+        process_dataset(args, config)
         logging.info("Experiment completed successfully!")
         
     except Exception as e:
@@ -62,7 +47,7 @@ def main():
     
     parser.add_argument('--dataset', choices=['techqa', 'smart_tv_remote','s10'], required=True,
                       help='Dataset to process')
-    parser.add_argument('--retriever', choices=['tfidf', 'cosine'], default='tfidf',
+    parser.add_argument('--retriever', choices=['tfidf', 'cosine', 'bm25', 'inverted', 'dense', 'hybrid'], default='tfidf',
                       help='Document retrieval method')
     parser.add_argument('--model-type', choices=['together', 'openai'], required=True,
                       help='Model service type')
@@ -80,7 +65,9 @@ def main():
     parser.add_argument('--end-idx', type=int,
                       help='Ending index for processing')
     parser.add_argument('--batch-size', type=int, default=1,
-                      help='Batch size for processing')
+                      help='Number of questions processed concurrently')
+    parser.add_argument('--resume', action='store_true',
+                      help='Skip questions that already have a valid result')
     
     args = parser.parse_args()
     run_experiment(args)
@@ -3,5 +3,7 @@
 Data loading and processing modules for TIDES
 """
 from .dataset_utils import DatasetLoader
+from .segmentation import Segmenter, TokenCounter
+from .corpus_store import CorpusStore, LazyCorpus
 
-__all__ = ['DatasetLoader']
\ No newline at end of file
+__all__ = ['DatasetLoader', 'Segmenter', 'TokenCounter', 'CorpusStore', 'LazyCorpus']
\ No newline at end of file
@@ -0,0 +1,170 @@
+# TIDES/src/data/corpus_store.py
+import json
+import logging
+import mmap
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+TEXTS_FILE = 'texts.bin'
+OFFSETS_FILE = 'offsets.npy'
+IDS_FILE = 'ids.json'
+SOURCE_FILE = 'source.json'
+
+class CorpusStore:
+    """Read-only corpus of documents stored as one UTF-8 blob plus an offset index.
+
+    Layout of a store directory:
+        texts.bin    concatenated UTF-8 document texts
+        offsets.npy  int64 array of N + 1 byte offsets into texts.bin
+        ids.json     document ids, in slot order
+        source.json  size and mtime of the raw file the store was built from, if any
+
+    The blob and offsets are memory-mapped, so opening a store costs one id lookup
+    table and each document read touches only its own bytes.
+    """
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / IDS_FILE, 'r', encoding='utf-8') as f:
+            self.ids = json.load(f)
+        self.slots = {doc_id: slot for slot, doc_id in enumerate(self.ids)}
+        self.offsets = np.load(self.store_dir / OFFSETS_FILE, mmap_mode='r')
+        self._file = open(self.store_dir / TEXTS_FILE, 'rb')
+        size = self.offsets[-1] if len(self.offsets) else 0
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._view = memoryview(self._blob)
+
+    @staticmethod
+    def exists(store_dir: Path) -> bool:
+        store_dir = Path(store_dir)
+        return all((store_dir / name).exists() for name in (TEXTS_FILE, OFFSETS_FILE, IDS_FILE))
+
+    @staticmethod
+    def source_stamp(source_path: Path) -> Dict[str, int]:
+        stat = Path(source_path).stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @classmethod
+    def is_current(cls, store_dir: Path, source_path: Path) -> bool:
+        """True if store_dir holds a complete store built from source_path as it is now."""
+        if not cls.exists(store_dir):
+            return False
+        try:
+            with open(Path(store_dir) / SOURCE_FILE, 'r') as f:
+                return json.load(f) == cls.source_stamp(source_path)
+        except (OSError, ValueError):
+            return False
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str]], store_dir: Path, source_path: Optional[Path] = None) -> int:
+        """Write (doc_id, text) pairs to store_dir, keeping the first text seen for a duplicated id.
+
+        The store is written to a sibling temp directory and swapped in only once it is
+        complete, so an interrupted rebuild leaves either the old store or none at all.
+        With source_path, the raw file's stamp is recorded for is_current().
+        """
+        store_dir = Path(store_dir)
+        # Stamped before reading, so an edit made during the build triggers another rebuild
+        stamp = cls.source_stamp(source_path) if source_path is not None else None
+        tmp_dir = store_dir.with_name(f'.{store_dir.name}.tmp')
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        ids, offsets, seen = [], [0], set()
+        with open(tmp_dir / TEXTS_FILE, 'wb') as f:
+            for doc_id, text in documents:
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                data = text.encode('utf-8')
+                f.write(data)
+                ids.append(doc_id)
+                offsets.append(offsets[-1] + len(data))
+        np.save(tmp_dir / OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+        with open(tmp_dir / IDS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(ids, f, ensure_ascii=False)
+        if stamp is not None:
+            with open(tmp_dir / SOURCE_FILE, 'w') as f:
+                json.dump(stamp, f)
+        cls._swap_in(tmp_dir, store_dir)
+        logging.getLogger(__name__).info(f"Wrote {len(ids)} documents ({offsets[-1]} bytes) to {store_dir}")
+        return len(ids)
+
+    @staticmethod
+    def _swap_in(tmp_dir: Path, store_dir: Path) -> None:
+        # Between the two renames store_dir is missing, so exists() reports no store rather than a mixed one
+        old_dir = store_dir.with_name(f'.{store_dir.name}.old')
+        if old_dir.exists():
+            shutil.rmtree(old_dir)
+        if store_dir.exists():
+            store_dir.rename(old_dir)
+        tmp_dir.rename(store_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.slots
+
+    def get_bytes(self, doc_id: str) -> Optional[memoryview]:
+        """Zero-copy view of a document's UTF-8 bytes, or None for unknown ids."""
+        slot = self.slots.get(doc_id)
+        if slot is None:
+            return None
+        return self._view[int(self.offsets[slot]):int(self.offsets[slot + 1])]
+
+    def get(self, doc_id: str) -> Optional[str]:
+        data = self.get_bytes(doc_id)
+        return None if data is None else str(data, 'utf-8')
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        return {doc_id: text for doc_id in doc_ids if (text := self.get(doc_id)) is not None}
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._file.close()
+
+class LazyCorpus(Mapping):
+    """Read-only {doc_id: text} mapping over a CorpusStore with a small LRU of decoded texts.
+
+    Iterating yields ids without touching document text; texts are decoded on first
+    access and only the ``cache_size`` most recently used ones are kept in memory.
+    """
+
+    def __init__(self, store: CorpusStore, cache_size: int = 1024):
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, doc_id: str) -> str:
+        with self._lock:
+            if doc_id in self._cache:
+                self._cache.move_to_end(doc_id)
+                return self._cache[doc_id]
+        text = self.store.get(doc_id)
+        if text is None:
+            raise KeyError(doc_id)
+        with self._lock:
+            self._cache[doc_id] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.ids)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self.store
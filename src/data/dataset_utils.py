@@ -1,9 +1,29 @@
 # TIDES/src/data/dataset_utils.py
+import csv
 import json
-import pandas as pd
 from pathlib import Path
 import logging
-from typing import Dict, Tuple, List, Any
+from typing import Dict, Tuple, List, Any, Iterator
+
+from .corpus_store import CorpusStore, LazyCorpus
+
+MANUAL_DATASETS = ('s10', 'smart_tv_remote')
+
+class QuestionStream:
+    """Re-iterable view of a dataset's questions; every pass re-reads the questions file."""
+
+    def __init__(self, loader: 'DatasetLoader', dataset_type: str):
+        self.loader = loader
+        self.dataset_type = dataset_type
+        self._count = None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.loader.iter_questions(self.dataset_type)
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
 
 class DatasetLoader:
     def __init__(self, config: Dict[str, Any]):
@@ -13,8 +33,11 @@ class DatasetLoader:
         self.raw_dir = self.base_dir / 'raw'
         self.processed_dir = self.base_dir / 'processed'
         self.logger = logging.getLogger(__name__)
+        self._corpus_store = None
 
-    def load_dataset(self, dataset_type: str) -> Dict[str, Any]:
+    def load_dataset(self, dataset_type: str, lazy: bool = False) -> Dict[str, Any]:
+        if lazy:
+            return self.load_lazy(dataset_type)
         if dataset_type == 'techqa':
             return self.load_techqa()
         elif dataset_type == 's10':
@@ -24,6 +47,75 @@ class DatasetLoader:
         else:
             raise ValueError(f"Unsupported dataset type: {dataset_type}")
 
+    def load_lazy(self, dataset_type: str) -> Dict[str, Any]:
+        """Dataset whose questions are streamed without pandas and whose corpus is read on demand.
+
+        questions is a QuestionStream, so callers iterate it and keep only the questions
+        they process. Manual corpora are served from a memory-mapped CorpusStore (built on first use under
+        data/processed/<dataset>/corpus and rebuilt when the raw corpus file changes) through
+        an LRU of data.document_cache_size texts; TechQA documents are already fetched per
+        question by load_documents.
+        """
+        if dataset_type != 'techqa' and dataset_type not in MANUAL_DATASETS:
+            raise ValueError(f"Unsupported dataset type: {dataset_type}")
+        questions = QuestionStream(self, dataset_type)
+        documents = {} if dataset_type == 'techqa' else self.open_manual_corpus(dataset_type)
+        self.logger.info(f"Lazily loaded {len(questions)} {dataset_type} questions and "
+                         f"{len(documents)} document sections")
+        return {
+            'questions': questions,
+            'documents': documents,
+            'metadata': {
+                'total_questions': len(questions),
+                'total_sections': len(documents),
+                'dataset_type': dataset_type
+            }
+        }
+
+    def iter_questions(self, dataset_type: str) -> Iterator[Dict[str, Any]]:
+        if dataset_type == 'techqa':
+            validation_path = self.raw_dir / 'techqa/TechQA/validation/validation_reference.json'
+            with open(validation_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for item in data:
+                yield {
+                    'question_id': item.get('QUESTION_ID', ''),
+                    'title': item.get('QUESTION_TITLE', ''),
+                    'body': item.get('QUESTION_TEXT', ''),
+                    'doc_ids': item.get('DOC_IDS', []),
+                    'answerable': item.get('ANSWERABLE', 'N'),
+                    'answer': item.get('ANSWER', '-'),
+                    'document': item.get('DOCUMENT', '-')
+                }
+        elif dataset_type in MANUAL_DATASETS:
+            questions_path = self.raw_dir / f'{dataset_type}/{dataset_type}_50_questions.csv'
+            with open(questions_path, 'r', encoding='utf-8', newline='') as f:
+                for idx, row in enumerate(csv.DictReader(f)):
+                    yield {
+                        'question_id': idx,
+                        'question': row['question'],
+                        'answer': row['answer']
+                    }
+        else:
+            raise ValueError(f"Unsupported dataset type: {dataset_type}")
+
+    def open_manual_corpus(self, dataset_type: str) -> LazyCorpus:
+        store_dir = self.processed_dir / dataset_type / 'corpus'
+        corpus_path = self.raw_dir / f'{dataset_type}/{dataset_type}_manual_corpus.json'
+        # Rebuilt whenever the raw corpus changes, so lazy and eager loading always serve the same sections
+        if not CorpusStore.is_current(store_dir, corpus_path):
+            with open(corpus_path, 'r', encoding='utf-8') as f:
+                corpus_data = json.load(f)
+            CorpusStore.build(
+                ((section_id, f"{content['title']}. {' '.join(content['text'])}")
+                 for section_id, content in corpus_data.items()),
+                store_dir,
+                source_path=corpus_path
+            )
+            del corpus_data
+        cache_size = self.config['data'].get('document_cache_size', 1024)
+        return LazyCorpus(CorpusStore(store_dir), cache_size)
+
     def load_techqa(self) -> Dict[str, Any]:
         try:
             validation_path = self.raw_dir / 'techqa/TechQA/validation/validation_reference.json'
@@ -60,6 +152,7 @@ class DatasetLoader:
     def load_smart_tv_remote(self) -> Dict[str, Any]:
         try:
             questions_path = self.raw_dir / 'smart_tv_remote/smart_tv_remote_50_questions.csv'
+            import pandas as pd
             questions_df = pd.read_csv(questions_path)
             
             corpus_path = self.raw_dir / 'smart_tv_remote/smart_tv_remote_manual_corpus.json'
@@ -100,6 +193,7 @@ class DatasetLoader:
     def load_s10(self) -> Dict[str, Any]:
         try:
             questions_path = self.raw_dir / 's10/s10_50_questions.csv'
+            import pandas as pd
             questions_df = pd.read_csv(questions_path)
             
             corpus_path = self.raw_dir / 's10/s10_manual_corpus.json'
@@ -138,7 +232,23 @@ class DatasetLoader:
             raise        
         
 
+    def corpus_store(self):
+        """The memory-mapped TechQA technote store, or None when only per-document JSON files exist."""
+        if self._corpus_store is None:
+            store_dir = self.processed_dir / 'techqa/corpus_val'
+            if CorpusStore.exists(store_dir):
+                self._corpus_store = CorpusStore(store_dir)
+        return self._corpus_store
+
     def load_documents(self, doc_ids: List[str]) -> Dict[str, str]:
+        store = self.corpus_store()
+        if store is not None:
+            documents = store.get_many(doc_ids)
+            for doc_id in doc_ids:
+                if doc_id not in documents:
+                    self.logger.error(f"Error loading document {doc_id}: not in corpus store")
+            return documents
+
         documents = {}
         for doc_id in doc_ids:
             try:
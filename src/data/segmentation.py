@@ -0,0 +1,127 @@
+# TIDES/src/data/segmentation.py
+import logging
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n|\n')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+class TokenCounter:
+    """Counts prompt tokens locally.
+
+    Uses tiktoken's BPE when it is installed (exact for OpenAI models, close for
+    LLaMA-family models); otherwise, or with ``encoding_name=None``, falls back to a
+    word/punctuation approximation scaled to typical BPE lengths. The encoding is
+    loaded on the first count, not at construction, since loading it may download
+    the BPE file.
+    """
+
+    def __init__(self, encoding_name: Optional[str] = 'cl100k_base'):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = encoding_name is None
+
+    @property
+    def encoding(self):
+        if not self._loaded:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logging.getLogger(__name__).debug(f"tiktoken unavailable, approximating token counts: {str(e)}")
+            self._loaded = True
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return int(len(APPROX_TOKEN.findall(text)) * 1.3) + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        words = text.split()
+        return ' '.join(words[:max(1, int(max_tokens / 1.3))])
+
+class Segmenter:
+    """Splits documents into paragraph segments and packs the most question-relevant ones into a token budget.
+
+    Segments are scored against the question with TF-IDF fitted on the document's own
+    segments; the best-scoring ones are kept until the budget is spent and then
+    emitted in their original order.
+    """
+
+    def __init__(self, max_segment_tokens: int = 256, budgets: Optional[Dict[str, int]] = None,
+                 token_counter: Optional[TokenCounter] = None):
+        self.max_segment_tokens = max_segment_tokens
+        self.budgets = budgets or {}
+        self.token_counter = token_counter or TokenCounter()
+
+    def budget_for(self, model_name: str) -> int:
+        return self.budgets.get(model_name, self.budgets.get('default', 1500))
+
+    def split(self, text: str) -> List[str]:
+        segments = []
+        for paragraph in PARAGRAPH_SPLIT.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if self.token_counter.count(paragraph) <= self.max_segment_tokens:
+                segments.append(paragraph)
+                continue
+            segments.extend(self._split_long(paragraph))
+        return segments
+
+    def _split_long(self, paragraph: str) -> List[str]:
+        segments, current, current_tokens = [], [], 0
+        for sentence in SENTENCE_SPLIT.split(paragraph):
+            tokens = self.token_counter.count(sentence)
+            if tokens > self.max_segment_tokens:
+                sentence = self.token_counter.truncate(sentence, self.max_segment_tokens)
+                tokens = self.max_segment_tokens
+            if current and current_tokens + tokens > self.max_segment_tokens:
+                segments.append(' '.join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            segments.append(' '.join(current))
+        return segments
+
+    def score(self, question: str, segments: List[str]) -> np.ndarray:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        try:
+            vectorizer = TfidfVectorizer(stop_words='english', strip_accents='unicode', lowercase=True)
+            segment_matrix = vectorizer.fit_transform(segments)
+            return (vectorizer.transform([question]) @ segment_matrix.T).toarray().ravel()
+        except ValueError:
+            # Empty vocabulary (e.g. segments made only of stop words)
+            return np.zeros(len(segments))
+
+    def pack(self, question: str, text: str, budget: int) -> str:
+        """Return the highest-scoring segments of text that fit in budget tokens, in document order."""
+        if self.token_counter.count(text) <= budget:
+            return text
+        segments = self.split(text)
+        if len(segments) <= 1:
+            return self.token_counter.truncate(text, budget)
+
+        scores = self.score(question, segments)
+        order = np.argsort(-scores, kind='stable')
+        kept, used = [], 0
+        for pos in order:
+            tokens = self.token_counter.count(segments[pos])
+            if used + tokens > budget:
+                continue
+            kept.append(pos)
+            used += tokens
+        if not kept:
+            return self.token_counter.truncate(segments[order[0]], budget)
+        return '\n'.join(segments[pos] for pos in sorted(kept))
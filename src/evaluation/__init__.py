@@ -3,6 +3,13 @@
 Evaluation modules for TIDES
 """
 from .evaluator import ResponseEvaluator
-from .metrics import MetricsCalculator
+from .prompts import PromptTemplate, PromptUsage, build_templates
 
-__all__ = ['ResponseEvaluator', 'MetricsCalculator']
\ No newline at end of file
+def __getattr__(name):
+    # The metrics stack (rouge_score, bert_score, torch) is only imported when first used
+    if name == 'MetricsCalculator':
+        from .metrics import MetricsCalculator
+        return MetricsCalculator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = ['ResponseEvaluator', 'MetricsCalculator', 'PromptTemplate', 'PromptUsage', 'build_templates']
\ No newline at end of file
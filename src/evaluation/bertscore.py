@@ -0,0 +1,132 @@
+# TIDES/src/evaluation/bertscore.py
+import hashlib
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+class BertScoreEngine:
+    """BERTScore F1 with a model loaded once and reference embeddings cached on disk.
+
+    Scores match ``bert_score.score(predictions, references, lang=...)`` (no idf,
+    no baseline rescaling). Sentences are embedded in batches sorted by token length
+    to keep padding low. With a ``cache_dir``, the embeddings of each reference set
+    are saved under a key built from the dataset and model. Later evaluations
+    against the same references then encode only the predictions.
+    """
+
+    def __init__(self, lang: str = 'en', model_type: Optional[str] = None, num_layers: Optional[int] = None,
+                 batch_size: int = 64, device: Optional[str] = None, cache_dir: Optional[Path] = None):
+        from bert_score.utils import lang2model, model2layers
+
+        self.model_type = model_type or lang2model[lang.lower()]
+        self.num_layers = num_layers or model2layers[self.model_type]
+        self.batch_size = batch_size
+        self.device = device
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._model = None
+        self._tokenizer = None
+        self._idf_dict = None
+        self._reference_cache: Dict[str, Dict[str, Tuple]] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _load(self):
+        if self._model is not None:
+            return
+        import torch
+        from bert_score.utils import get_model, get_tokenizer
+
+        if self.device is None:
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self._tokenizer = get_tokenizer(self.model_type, False)
+        self._model = get_model(self.model_type, self.num_layers, False).to(self.device)
+        self._idf_dict = defaultdict(lambda: 1.0)
+        self._idf_dict[self._tokenizer.sep_token_id] = 0
+        self._idf_dict[self._tokenizer.cls_token_id] = 0
+        self.logger.info(f"Loaded BERTScore model {self.model_type} (layer {self.num_layers}) on {self.device}")
+
+    @staticmethod
+    def _sentence_key(sentence: str) -> str:
+        return hashlib.sha1(sentence.encode('utf-8')).hexdigest()
+
+    def embed(self, sentences: List[str]) -> Dict[str, Tuple]:
+        """{sentence hash: (token embeddings, idf weights)} on CPU, one entry per unique sentence."""
+        import torch
+        from bert_score.utils import get_bert_embedding, sent_encode
+
+        self._load()
+        unique = sorted(set(sentences), key=lambda s: len(sent_encode(self._tokenizer, s)), reverse=True)
+        stats = {}
+        with torch.no_grad():
+            for start in range(0, len(unique), self.batch_size):
+                batch = unique[start:start + self.batch_size]
+                embs, masks, padded_idf = get_bert_embedding(
+                    batch, self._model, self._tokenizer, self._idf_dict, device=self.device
+                )
+                embs, masks, padded_idf = embs.cpu(), masks.cpu(), padded_idf.cpu()
+                for i, sentence in enumerate(batch):
+                    length = masks[i].sum().item()
+                    stats[self._sentence_key(sentence)] = (embs[i, :length].clone(), padded_idf[i, :length].clone())
+        return stats
+
+    def _cache_path(self, reference_key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        model_slug = self.model_type.replace('/', '--')
+        return self.cache_dir / f'{reference_key}_{model_slug}_L{self.num_layers}.pt'
+
+    def reference_stats(self, references: List[str], reference_key: Optional[str] = None) -> Dict[str, Tuple]:
+        """Embeddings for references, read from (and added to) the reference cache for reference_key."""
+        import torch
+
+        if reference_key is None:
+            return self.embed(references)
+        stats = self._reference_cache.get(reference_key)
+        path = self._cache_path(reference_key)
+        if stats is None:
+            stats = {}
+            if path is not None and path.exists():
+                try:
+                    stats = torch.load(path)
+                except Exception as e:
+                    self.logger.warning(f"Ignoring unreadable BERTScore cache {path}: {str(e)}")
+            self._reference_cache[reference_key] = stats
+        missing = [ref for ref in set(references) if self._sentence_key(ref) not in stats]
+        if missing:
+            stats.update(self.embed(missing))
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + '.tmp')
+                torch.save(stats, tmp_path)
+                os.replace(tmp_path, path)
+        return stats
+
+    def _pad(self, sentences: List[str], stats: Dict[str, Tuple]):
+        import torch
+        from torch.nn.utils.rnn import pad_sequence
+
+        emb, idf = zip(*(stats[self._sentence_key(s)] for s in sentences))
+        lens = torch.tensor([e.size(0) for e in emb], dtype=torch.long)
+        emb_pad = pad_sequence([e.to(self.device) for e in emb], batch_first=True, padding_value=2.0)
+        idf_pad = pad_sequence([i.to(self.device) for i in idf], batch_first=True)
+        mask = (torch.arange(int(lens.max()), dtype=torch.long).expand(len(lens), -1) < lens.unsqueeze(1))
+        return emb_pad, mask.to(self.device), idf_pad
+
+    def score(self, predictions: List[str], references: List[str], reference_key: Optional[str] = None) -> List[float]:
+        """Per-pair BERTScore F1."""
+        import torch
+        from bert_score.utils import greedy_cos_idf
+
+        self._load()
+        ref_stats = self.reference_stats(references, reference_key)
+        hyp_stats = self.embed(predictions)
+        f1_scores = []
+        with torch.no_grad():
+            for start in range(0, len(references), self.batch_size):
+                _, _, f1 = greedy_cos_idf(
+                    *self._pad(references[start:start + self.batch_size], ref_stats),
+                    *self._pad(predictions[start:start + self.batch_size], hyp_stats)
+                )
+                f1_scores.extend(f1.cpu().tolist())
+        return f1_scores
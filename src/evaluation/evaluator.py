@@ -1,28 +1,56 @@
 # TIDES/src/evaluation/evaluator.py
+import contextvars
 import logging
+import re
 from typing import Dict, List, Any
 import time
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
+from ..data.segmentation import Segmenter, TokenCounter
+from .prompts import PromptUsage, build_templates
+
+# Prompt token tally of the question being evaluated; copied into Stage 1/2 worker threads
+_PROMPT_USAGE = contextvars.ContextVar('prompt_usage', default=None)
+
 class ResponseEvaluator:
     def __init__(self, model_manager, dataset_type, config=None):
         self.model_manager = model_manager
         self.dataset_type = dataset_type
         self.config = config or {}
         self.instructions = self._load_instructions()
+        self.templates = build_templates(self.instructions)
+        self.chat_prompts = self.config.get('system_prompts', True)
         self.logger = logging.getLogger(__name__)
+        segmentation = self.config.get('segmentation') or {}
+        # tiktoken (loaded on first count) only when segmentation or batched Stage 1 prompts size
+        # by tokens; otherwise prompt_tokens accounting uses the regex approximation
+        exact_counts = segmentation.get('enabled') or self.config.get('relevance_batch_size', 1) > 1
+        self.token_counter = TokenCounter() if exact_counts else TokenCounter(encoding_name=None)
+        self._prefix_tokens = {}
+        self.segmenter = None
+        if segmentation.get('enabled'):
+            self.segmenter = Segmenter(
+                max_segment_tokens=segmentation.get('max_segment_tokens', 256),
+                budgets=segmentation.get('budgets'),
+                token_counter=self.token_counter
+            )
 
     def _load_instructions(self) -> Dict[str, str]:
         return {
             'step1': """You're an expert in IT and computer science. Provide a rationale in 20 words or less for how the paragraph relates to the question, focusing on key technical details. Finally, give a clear yes or no answer avoiding overconfidence.""",
             
+            'step1_batch': """You're an expert in IT and computer science. For each numbered paragraph, provide a rationale in 20 words or less for how the paragraph relates to the question, focusing on key technical details. Finally, give a clear yes or no answer avoiding overconfidence. Reply with exactly one line per paragraph in the form "<number>: <rationale> | <yes or no>".""",
+            
             'step2': """You're an expert in IT and computer science. Given a question and a context, if the context contains information that directly answers the question or provides clear supporting evidence, extract only the relevant section. Do not include any additional explanation or comments. If no relevant information is found, simply respond 'No'.""",
             
             'step3': """Compose a concise answer to the question using the most relevant key words and phrases from the rationales. Aim for a natural response while still aligning closely with the rationales. If the rationales do not sufficiently address the question, respond with 'No answer'."""
         }
 
-    def evaluate(self, question: str, context: Dict[str, str], retrieved_docs: List[str]) -> Dict[str, Any]:
+    def evaluate(self, question: str, context: Dict[str, Any], retrieved_docs: Dict[str, List]) -> Dict[str, Any]:
+        usage = PromptUsage()
+        usage_token = _PROMPT_USAGE.set(usage)
         try:
             start_time = time.time()
             result = {
@@ -30,17 +58,27 @@ class ResponseEvaluator:
                 'retrieved_docs': retrieved_docs,
                 'timestamps': {}
             }
-            self.logger.info("Starting Step 1: Document Selection")
-            step1_start = time.time()
-            relevant_docs = self._select_relevant_documents(question, context)
-            result['stage1'] = relevant_docs
-            result['timestamps']['step1'] = time.time() - step1_start
-
-            self.logger.info("Starting Step 2: Evidence Collection")
-            step2_start = time.time()
-            evidence = self._collect_evidence(question, relevant_docs['selected_docs'])
-            result['stage2'] = evidence
-            result['timestamps']['step2'] = time.time() - step2_start
+            context, pruned_docs = self._prepare_context(context, retrieved_docs)
+            result['pruned_docs'] = pruned_docs
+            if self.segmenter is not None:
+                context, result['segmentation'] = self._segment_context(question, context)
+            if self.config.get('streaming'):
+                self.logger.info("Starting Steps 1-2: Streaming Selection and Evidence Collection")
+                relevant_docs, evidence = self._select_and_collect_streaming(question, context, result['timestamps'])
+                result['stage1'] = relevant_docs
+                result['stage2'] = evidence
+            else:
+                self.logger.info("Starting Step 1: Document Selection")
+                step1_start = time.time()
+                relevant_docs = self._select_relevant_documents(question, context)
+                result['stage1'] = relevant_docs
+                result['timestamps']['step1'] = time.time() - step1_start
+
+                self.logger.info("Starting Step 2: Evidence Collection")
+                step2_start = time.time()
+                evidence = self._collect_evidence(question, relevant_docs['selected_docs'])
+                result['stage2'] = evidence
+                result['timestamps']['step2'] = time.time() - step2_start
 
             self.logger.info("Starting Step 3: Answer Generation")
             step3_start = time.time()
@@ -49,20 +87,191 @@ class ResponseEvaluator:
             result['timestamps']['step3'] = time.time() - step3_start
 
             result['total_time'] = time.time() - start_time
+            result['prompt_tokens'] = usage.summary()
             
             return result
             
         except Exception as e:
             self.logger.error(f"Error in evaluation process: {str(e)}")
             raise
+        finally:
+            _PROMPT_USAGE.reset(usage_token)
+
+    def _prepare_context(self, context: Dict[str, Any], retrieved_docs: Dict[str, List]):
+        """Restrict the LLM context to the retriever's top-k (in rank order) unless evaluation.context is 'full'.
+
+        Returns the kept {doc_id: text} mapping and a pruning summary: how many corpus
+        documents were left out, and the ids of retrieved documents dropped by
+        evaluation.min_retrieval_score. Documents outside the top-k are only counted, so
+        results stay small on large corpora.
+        """
+        doc_ids = list(context.keys())
+        below_min_score = []
+        if self.config.get('context', 'retrieved') == 'full' or not retrieved_docs:
+            kept_ids = doc_ids
+        else:
+            min_score = self.config.get('min_retrieval_score')
+            kept_ids = []
+            for index, score in zip(retrieved_docs['indices'], retrieved_docs['scores']):
+                if min_score is None or score >= min_score:
+                    kept_ids.append(doc_ids[index])
+                else:
+                    below_min_score.append(doc_ids[index])
+        pruned = {
+            'count': len(doc_ids) - len(kept_ids),
+            'below_min_score': below_min_score
+        }
+        return {doc_id: self._document_text(context[doc_id]) for doc_id in kept_ids}, pruned
+
+    def _segment_context(self, question: str, context: Dict[str, str]):
+        """Pack each document down to its best TF-IDF segments within the model's token budget."""
+        budget = self.segmenter.budget_for(getattr(self.model_manager, 'model_name', 'default'))
+        tokens_before = tokens_after = 0
+        packed = {}
+        for doc_id, text in context.items():
+            packed[doc_id] = self.segmenter.pack(question, text, budget)
+            tokens_before += self.token_counter.count(text)
+            tokens_after += self.token_counter.count(packed[doc_id])
+        return packed, {
+            'budget': budget,
+            'tokens_before': tokens_before,
+            'tokens_after': tokens_after
+        }
+
+    @staticmethod
+    def _document_text(document: Any) -> str:
+        if isinstance(document, dict):
+            return f"{document.get('title', '')}. {document.get('text', '')}"
+        return document
+
+    def _map_concurrent(self, func, items: List[Any]) -> List[Any]:
+        """Apply func to items on a bounded thread pool, returning results in input order."""
+        max_concurrency = self.config.get('max_concurrency', 1)
+        if max_concurrency <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(items))) as executor:
+            futures = [self._submit(executor, func, item) for item in items]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _submit(executor, func, *args):
+        # Run in a copy of the caller's context so the worker records into the same PromptUsage
+        return executor.submit(contextvars.copy_context().run, func, *args)
+
+    def _call_model(self, stage: str, prompt) -> str:
+        usage = _PROMPT_USAGE.get()
+        if usage is not None:
+            if self.chat_prompts:
+                if stage not in self._prefix_tokens:
+                    self._prefix_tokens[stage] = self.token_counter.count(self.templates[stage].instruction)
+                usage.record(stage, self._prefix_tokens[stage], self.token_counter.count(prompt[-1]['content']))
+            else:
+                usage.record(stage, 0, self.token_counter.count(prompt))
+        return self.model_manager.call_with_retry(prompt, stage=stage)
+
+    def _select_and_collect_streaming(self, question: str, context: Dict[str, str],
+                                      timestamps: Dict[str, float]):
+        """Run Stage 2 for each document as soon as its Stage 1 verdict is 'yes'.
+
+        Both stages share one pool of evaluation.max_concurrency workers, but Stage 1
+        prompts are fed in through a window of that many at a time: an evidence call
+        queued by a verdict only waits behind Stage 1 calls already in flight, not the
+        whole Stage 1 backlog. Outputs are reassembled in context order so they match
+        the sequential path. timestamps gets step1 (until the last verdict), step2
+        (evidence calls still running after it), step2_overlap (evidence call time
+        spent while Stage 1 was still running) and critical_path (the longest
+        Stage 1 -> Stage 2 call chain of any one document, the Steps 1-2 time with
+        unlimited workers).
+        """
+        items = list(context.items())
+        preds = [None] * len(items)
+        responses = [None] * len(items)
+        evidence_spans = []
+        # Per document: its Stage 1 call time, plus its evidence call time once that finishes
+        chains = [0.0] * len(items)
+        workers = max(1, self.config.get('max_concurrency', 1))
+        batches = self._relevance_batches(items)
+        unsubmitted = iter(batches)
+        stage1_left = len(batches)
+        start = step1_end = time.time()
+
+        def timed_relevance(batch):
+            call_start = time.time()
+            batch_preds = self._evaluate_relevance_batch(question, [items[pos][1] for pos in batch])
+            return batch_preds, time.time() - call_start
+
+        def timed_evidence(pos):
+            call_start = time.time()
+            try:
+                return self._extract_evidence(question, items[pos][1])
+            finally:
+                call_end = time.time()
+                evidence_spans.append((call_start, call_end))
+                chains[pos] += call_end - call_start
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+
+            def submit_stage1():
+                batch = next(unsubmitted, None)
+                if batch is not None:
+                    pending[self._submit(executor, timed_relevance, batch)] = ('step1', batch)
+
+            for _ in range(workers):
+                submit_stage1()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, payload = pending.pop(future)
+                    if stage == 'step2':
+                        responses[payload] = future.result()
+                        continue
+                    batch_preds, duration = future.result()
+                    for pos, pred in zip(payload, batch_preds):
+                        preds[pos] = pred
+                        chains[pos] = duration
+                        if pred['is_relevant']:
+                            pending[self._submit(executor, timed_evidence, pos)] = ('step2', pos)
+                    # Queued after this batch's evidence calls, so those get the next free worker
+                    submit_stage1()
+                    stage1_left -= 1
+                    if stage1_left == 0:
+                        step1_end = time.time()
+        end = time.time()
+        timestamps['step1'] = step1_end - start
+        timestamps['step2'] = end - step1_end
+        timestamps['step2_overlap'] = sum(
+            max(0.0, min(call_end, step1_end) - call_start) for call_start, call_end in evidence_spans
+        )
+        timestamps['critical_path'] = max(chains, default=0.0)
+
+        relevant_docs = self._build_selection(items, preds)
+        rationales = [
+            {'doc_id': items[pos][0], 'content': response}
+            for pos, response in enumerate(responses)
+            if self._is_evidence(response)
+        ]
+        return relevant_docs, {'rationales': rationales}
 
     def _select_relevant_documents(self, question: str, context: Dict[str, str]) -> Dict[str, Any]:
+        items = list(context.items())
+        self.logger.debug(f"Evaluating {len(items)} documents")
+        batches = self._relevance_batches(items)
+        batch_preds = self._map_concurrent(
+            lambda batch: self._evaluate_relevance_batch(question, [items[pos][1] for pos in batch]),
+            batches
+        )
+        preds = [None] * len(items)
+        for batch, batch_pred in zip(batches, batch_preds):
+            for pos, pred in zip(batch, batch_pred):
+                preds[pos] = pred
+        return self._build_selection(items, preds)
+
+    def _build_selection(self, items: List[tuple], preds: List[Dict[str, Any]]) -> Dict[str, Any]:
         selected_docs = []
         predictions = []
 
-        for doc_id, content in context.items():
-            self.logger.debug(f"Evaluating document {doc_id}")
-            pred = self._evaluate_relevance(question, content)
+        for (doc_id, content), pred in zip(items, preds):
             if pred['is_relevant']:
                 selected_docs.append({
                     'doc_id': doc_id,
@@ -80,22 +289,79 @@ class ResponseEvaluator:
 
     def _evaluate_relevance(self, question: str, document: str) -> Dict[str, Any]:
         prompt = self._create_relevance_prompt(question, document)
-        response = self.model_manager.call_with_retry(prompt)
+        response = self._call_model('step1', prompt)
         
         return {
             'is_relevant': 'yes' in response.lower(),
             'response': response
         }
 
+    def _relevance_batches(self, items: List[tuple]) -> List[List[int]]:
+        """Group document positions into Stage 1 prompts.
+
+        With evaluation.relevance_batch_size > 1, consecutive paragraphs are packed into one
+        prompt until the size or the evaluation.relevance_batch_tokens budget is reached.
+        """
+        batch_size = self.config.get('relevance_batch_size', 1)
+        token_budget = self.config.get('relevance_batch_tokens', 3000)
+        if batch_size <= 1:
+            return [[pos] for pos in range(len(items))]
+
+        batches, current, current_tokens = [], [], 0
+        for pos, (doc_id, content) in enumerate(items):
+            tokens = self._estimate_tokens(content)
+            if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(pos)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _estimate_tokens(self, text: str) -> int:
+        return self.token_counter.count(text)
+
+    def _evaluate_relevance_batch(self, question: str, documents: List[str]) -> List[Dict[str, Any]]:
+        """Judge several paragraphs with one prompt, falling back to single prompts for unparsed ones."""
+        if len(documents) == 1:
+            return [self._evaluate_relevance(question, documents[0])]
+
+        prompt = self._create_batch_relevance_prompt(question, documents)
+        response = self._call_model('step1_batch', prompt)
+        verdicts = self._parse_batch_relevance(response, len(documents))
+
+        preds = []
+        for number, document in enumerate(documents, start=1):
+            if number in verdicts:
+                is_relevant, line = verdicts[number]
+                preds.append({'is_relevant': is_relevant, 'response': line, 'batched': True})
+            else:
+                self.logger.debug(f"No parsable verdict for paragraph {number}, asking individually")
+                preds.append(self._evaluate_relevance(question, document))
+        return preds
+
+    @staticmethod
+    def _parse_batch_relevance(response: str, count: int) -> Dict[int, tuple]:
+        verdicts = {}
+        for line in (response or '').splitlines():
+            match = re.match(r'^\s*\[?(\d+)\]?\s*[:.)\-]\s*(.+)$', line)
+            if not match:
+                continue
+            number = int(match.group(1))
+            answers = re.findall(r'\b(yes|no)\b', match.group(2).lower())
+            if 1 <= number <= count and answers and number not in verdicts:
+                verdicts[number] = (answers[-1] == 'yes', match.group(2).strip())
+        return verdicts
+
     def _collect_evidence(self, question: str, documents: List[Dict[str, str]]) -> Dict[str, List]:
         rationales = []
         
         for doc in documents:
             self.logger.debug(f"Collecting evidence from document {doc['doc_id']}")
-            prompt = self._create_evidence_prompt(question, doc['content'])
-            response = self.model_manager.call_with_retry(prompt)
+            response = self._extract_evidence(question, doc['content'])
             
-            if response and response.lower() != 'no':
+            if self._is_evidence(response):
                 rationales.append({
                     'doc_id': doc['doc_id'],
                     'content': response
@@ -103,29 +369,43 @@ class ResponseEvaluator:
 
         return {'rationales': rationales}
 
+    def _extract_evidence(self, question: str, document: str) -> str:
+        prompt = self._create_evidence_prompt(question, document)
+        return self._call_model('step2', prompt)
+
+    @staticmethod
+    def _is_evidence(response: str) -> bool:
+        return bool(response) and response.lower() != 'no'
+
     def _generate_answer(self, question: str, rationales: List[Dict[str, str]]) -> str:
         if not rationales:
             return "No answer"
         
         prompt = self._create_answer_prompt(question, rationales)
-        return self.model_manager.call_with_retry(prompt)
+        return self._call_model('step3', prompt)
+
+    def _create_relevance_prompt(self, question: str, document: str):
+        return self.templates['step1'].render(self.chat_prompts, question=question, document=document)
 
-    def _create_relevance_prompt(self, question: str, document: str) -> str:
-        return f"{self.instructions['step1']}\n###Question: {question}\n###Paragraph: {document}\n###Output: "
+    def _create_batch_relevance_prompt(self, question: str, documents: List[str]):
+        paragraphs = "\n".join(f"[{number}] {document}" for number, document in enumerate(documents, start=1))
+        return self.templates['step1_batch'].render(self.chat_prompts, question=question, paragraphs=paragraphs)
 
-    def _create_evidence_prompt(self, question: str, document: str) -> str:
-        return f"{self.instructions['step2']}\n###Question: {question}\n###Context: {document}\n###Relevant excerpt: "
+    def _create_evidence_prompt(self, question: str, document: str):
+        return self.templates['step2'].render(self.chat_prompts, question=question, document=document)
 
-    def _create_answer_prompt(self, question: str, rationales: List[Dict[str, str]]) -> str:
+    def _create_answer_prompt(self, question: str, rationales: List[Dict[str, str]]):
         rationale_texts = [r['content'] for r in rationales]
         context = "\n".join(rationale_texts)
-        return f"{self.instructions['step3']}\nQuestion: {question}\nContext: {context}\nOutput: {{answer summary}}"
+        return self.templates['step3'].render(self.chat_prompts, question=question, context=context)
 
     def save_results(self, results: Dict[str, Any], output_path: Path) -> None:
         try:
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w') as f:
+            tmp_path = output_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
                 json.dump(results, f, indent=2)
+            tmp_path.replace(output_path)
             self.logger.info(f"Results saved to {output_path}")
         except Exception as e:
             self.logger.error(f"Error saving results: {str(e)}")
@@ -0,0 +1,96 @@
+# TIDES/src/evaluation/lexical_metrics.py
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+# rouge_score.tokenize rather than tokenizers.DefaultTokenizer: same tokens without a stemmer,
+# and it does not import nltk
+from rouge_score import scoring, tokenize
+
+def lcs_length(target: List[str], prediction: List[str]) -> int:
+    """Length of the longest common subsequence, bit-parallel over the target tokens."""
+    masks: Dict[str, int] = {}
+    for i, token in enumerate(target):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    full = (1 << len(target)) - 1
+    v = full
+    for token in prediction:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(target) - bin(v).count('1')
+
+def _ngram_score(target: Counter, prediction: Counter) -> Tuple[float, float, float]:
+    overlap = sum((target & prediction).values())
+    precision = overlap / max(sum(prediction.values()), 1)
+    recall = overlap / max(sum(target.values()), 1)
+    return precision, recall, scoring.fmeasure(precision, recall)
+
+def _lcs_score(target: List[str], prediction: List[str]) -> Tuple[float, float, float]:
+    if not target or not prediction:
+        return 0, 0, 0
+    lcs = lcs_length(target, prediction)
+    precision = lcs / len(prediction)
+    recall = lcs / len(target)
+    return precision, recall, scoring.fmeasure(precision, recall)
+
+class _Features:
+    """Everything the lexical metrics need from one text, computed once per unique text."""
+    __slots__ = ('words', 'tokens', 'unigrams', 'bigrams')
+
+    def __init__(self, text: str):
+        self.words = set(text.split())
+        self.tokens = tokenize.tokenize(text, None)
+        self.unigrams = Counter(self.tokens)
+        self.bigrams = Counter(zip(self.tokens, self.tokens[1:]))
+
+def _token_f1(pred: str, ref: str, pred_features: _Features, ref_features: _Features) -> Optional[float]:
+    if pred == "-" or ref == "-":
+        return None
+    pred_count = len(pred.split())
+    ref_count = len(ref.split())
+    common = len(pred_features.words & ref_features.words)
+    precision = common / pred_count if pred_count else 0
+    recall = common / ref_count if ref_count else 0
+    return 2 * (precision * recall) / (precision + recall) if precision + recall > 0 else 0
+
+def _score_chunk(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    features: Dict[str, _Features] = {}
+    results = []
+    for pred, ref in pairs:
+        for text in (pred, ref):
+            if text not in features:
+                features[text] = _Features(text)
+        p, r = features[pred], features[ref]
+        results.append({
+            'token_f1': _token_f1(pred, ref, p, r),
+            'rouge1': _ngram_score(r.unigrams, p.unigrams),
+            'rouge2': _ngram_score(r.bigrams, p.bigrams),
+            'rougeL': _lcs_score(r.tokens, p.tokens)
+        })
+    return results
+
+class LexicalMetrics:
+    """Per-pair token F1 and ROUGE-1/2/L, equal to the pipeline's token F1 and rouge_score.
+
+    Each unique text is tokenised once per chunk. n-gram overlap uses Counter
+    intersection, and ROUGE-L uses a bit-parallel LCS: one big-integer step per
+    prediction token instead of rouge_score's O(n*m) table. Sets of at least
+    ``parallel_threshold`` pairs are split into chunks and scored in a process pool.
+    """
+
+    def __init__(self, processes: Optional[int] = None, chunk_size: int = 2000, parallel_threshold: int = 10000):
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+
+    def score(self, predictions: List[str], references: List[str]) -> List[Dict[str, Any]]:
+        """[{'token_f1': float or None, 'rouge1'/'rouge2'/'rougeL': (precision, recall, fmeasure)}] per pair."""
+        pairs = list(zip(predictions, references))
+        if len(pairs) < self.parallel_threshold or self.processes == 1:
+            return _score_chunk(pairs)
+        chunks = [pairs[start:start + self.chunk_size] for start in range(0, len(pairs), self.chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            for chunk_results in pool.map(_score_chunk, chunks):
+                results.extend(chunk_results)
+        return results
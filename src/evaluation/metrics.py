@@ -1,76 +1,131 @@
 # TIDES/src/evaluation/metrics.py
-import bert_score
-import evaluate
-from typing import List, Dict, Any
+from rouge_score import scoring
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import logging
 import pandas as pd
 import json
 import os
 
+from .bertscore import BertScoreEngine
+from .lexical_metrics import LexicalMetrics
+from .score_cache import ScoreCache
+from ..utils.result_store import iter_run_results
+
+ROUGE_TYPES = ['rouge1', 'rouge2', 'rougeL']
+SCORE_CACHE_FILE = 'metrics_cache.json'
+
 class MetricsCalculator:
-    def __init__(self):
-        self.rouge = evaluate.load("rouge")
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        # Kept for the calculator's lifetime: the scoring model loads once and reference
+        # embeddings are reused across evaluations (and across runs via cache_dir)
+        self.bert_scorer = BertScoreEngine(
+            batch_size=config.get('bert_batch_size', 64),
+            cache_dir=config.get('cache_dir')
+        )
+        # Token F1 and ROUGE-1/2/L per pair, identical to rouge_score's RougeScorer defaults
+        self.lexical = LexicalMetrics(processes=config.get('lexical_processes'))
+        self.incremental = config.get('incremental', True)
+        self.logger = logging.getLogger(__name__)
 
     def calculate_token_f1(self, predictions: List[str], references: List[str]) -> float:
-        f1_scores = []
-        for pred, ref in zip(predictions, references):
-            if pred == "-" or ref == "-":
-                continue
-            
-            pred_tokens = pred.split()
-            ref_tokens = ref.split()
-            common_tokens = set(pred_tokens) & set(ref_tokens)
-            
-            precision = len(common_tokens) / len(pred_tokens) if pred_tokens else 0
-            recall = len(common_tokens) / len(ref_tokens) if ref_tokens else 0
-            
-            f1 = 2 * (precision * recall) / (precision + recall) if precision + recall > 0 else 0
-            f1_scores.append(f1)
-            
+        f1_scores = [pair['token_f1'] for pair in self.lexical.score(predictions, references)
+                     if pair['token_f1'] is not None]
         return sum(f1_scores) / len(f1_scores) if f1_scores else 0
 
-    def calculate_bert_score(self, predictions: List[str], references: List[str]) -> float:
-        bert_result = bert_score.score(predictions, references, lang="en", verbose=True)
-        bert_f1_scores = bert_result[2].tolist()  # F1 scores
+    def calculate_bert_score(self, predictions: List[str], references: List[str],
+                             reference_key: Optional[str] = None) -> float:
+        bert_f1_scores = self.bert_scorer.score(predictions, references, reference_key)
         return sum(bert_f1_scores) / len(bert_f1_scores)
 
     def calculate_rouge_scores(self, predictions: List[str], references: List[str]) -> Dict[str, float]:
-        return self.rouge.compute(predictions=predictions, references=references)
+        return self.aggregate_rouge([
+            {rouge_type: scoring.Score(*pair[rouge_type]) for rouge_type in ROUGE_TYPES}
+            for pair in self.lexical.score(predictions, references)
+        ])
+
+    @staticmethod
+    def aggregate_rouge(pair_scores: List[Dict[str, scoring.Score]]) -> Dict[str, float]:
+        """Bootstrap mid F-measure per ROUGE type, as evaluate's "rouge" metric reports it."""
+        aggregator = scoring.BootstrapAggregator()
+        for score in pair_scores:
+            aggregator.add_scores(score)
+        return {rouge_type: score.mid.fmeasure for rouge_type, score in aggregator.aggregate().items()}
+
+    def _pair_scores(self, metric: str, pairs: List[Tuple[str, str]], cache: Optional[ScoreCache],
+                     compute: Callable[[List[Tuple[str, str]]], List[Any]]) -> List[Any]:
+        """Per-pair values of one metric, scoring only the pairs missing from the cache."""
+        values = [None] * len(pairs)
+        todo = []
+        for i, (pred, ref) in enumerate(pairs):
+            if cache is not None and cache.contains(pred, ref, metric):
+                values[i] = cache.get(pred, ref, metric)
+            else:
+                todo.append(i)
+        if todo:
+            for i, value in zip(todo, compute([pairs[i] for i in todo])):
+                values[i] = value
+                if cache is not None:
+                    cache.put(*pairs[i], metric, value)
+        self.logger.info(f"{metric}: scored {len(todo)} pairs, reused {len(pairs) - len(todo)}")
+        return values
+
+    def score_predictions(self, predictions: List[str], references: List[str],
+                          reference_key: Optional[str] = None, output_dir: Optional[str] = None) -> Dict[str, float]:
+        """Aggregate metrics for prediction/reference pairs.
+
+        With incremental evaluation on, per-pair scores are kept in a sidecar next to the
+        results (output_dir/metrics_cache.json) and only new or changed pairs are scored.
+        """
+        cache = ScoreCache(Path(output_dir) / SCORE_CACHE_FILE) if self.incremental and output_dir else None
+        pairs = list(zip(predictions, references))
+        bert_metric = f'bert_score/{self.bert_scorer.model_type}/L{self.bert_scorer.num_layers}'
+
+        bert_f1_scores = self._pair_scores(bert_metric, pairs, cache, lambda todo: self.bert_scorer.score(
+            [pred for pred, _ in todo], [ref for _, ref in todo], reference_key
+        ))
+        lexical_scores = self._pair_scores('lexical', pairs, cache, lambda todo: self.lexical.score(
+            [pred for pred, _ in todo], [ref for _, ref in todo]
+        ))
+        if cache is not None:
+            cache.save()
+
+        token_f1_scores = [pair['token_f1'] for pair in lexical_scores if pair['token_f1'] is not None]
+        rouge = self.aggregate_rouge([
+            {rouge_type: scoring.Score(*pair[rouge_type]) for rouge_type in ROUGE_TYPES}
+            for pair in lexical_scores
+        ])
+        return {
+            'bert_score': sum(bert_f1_scores) / len(bert_f1_scores) * 100,
+            'token_f1': (sum(token_f1_scores) / len(token_f1_scores) if token_f1_scores else 0) * 100,
+            'rouge1': rouge['rouge1'] * 100,
+            'rouge2': rouge['rouge2'] * 100,
+            'rougeL': rouge['rougeL'] * 100
+        }
+
+    @staticmethod
+    def load_predictions(output_dir: str, count: int) -> List[str]:
+        """Stage 3 answers for the first `count` questions, "" where a result is missing."""
+        predictions = [""] * count
+        for idx, result in iter_run_results(output_dir):
+            if idx < count:
+                predictions[idx] = result.get("stage3", "")
+        return predictions
 
     def evaluate_techqa(self, output_dir: str, reference_dir: str) -> Dict[str, float]:
-        predictions = []
         references = []
-        
+
         for i in range(20):  # TechQA validation set size
-                
+
             # Load reference
             ref_path = os.path.join(reference_dir, f"{str(i).zfill(3)}.json")
             with open(ref_path, "r") as f:
                 refer = json.load(f)
             references.append(refer["gt"])
-            
-            # Load prediction
-            try:
-                pred_path = os.path.join(output_dir, f"result{str(i).zfill(3)}.json")
-                with open(pred_path, "r") as f:
-                    result = json.load(f)
-                predictions.append(result["stage3"])
-            except (FileNotFoundError, json.JSONDecodeError):
-                predictions.append("")
-        
-        # Calculate metrics
-        metrics = {
-            'bert_score': self.calculate_bert_score(predictions, references) * 100,
-            'token_f1': self.calculate_token_f1(predictions, references) * 100
-        }
-        
-        rouge_scores = self.calculate_rouge_scores(predictions, references)
-        metrics.update({
-            'rouge1': rouge_scores['rouge1'] * 100,
-            'rouge2': rouge_scores['rouge2'] * 100,
-            'rougeL': rouge_scores['rougeL'] * 100
-        })
-        
-        return metrics
+
+        predictions = self.load_predictions(output_dir, len(references))
+        return self.score_predictions(predictions, references, 'techqa', output_dir)
 
     def evaluate_manual(self, output_dir: str, dataset_type: str) -> Dict[str, float]:
         # Load questions data
@@ -78,34 +133,13 @@ class MetricsCalculator:
             question_path = "data/raw/s10/s10_50_questions.csv"
         else:  # smart_tv_remote
             question_path = "data/raw/smart_tv_remote/smart_tv_remote_50_questions.csv"
-            
+
         questions_df = pd.read_csv(question_path)
-        
-        predictions = []
+
         references = []
-        
+
         for i in range(len(questions_df)):
             references.append(questions_df.loc[i, "answer"])
-            
-            try:
-                pred_path = os.path.join(output_dir, f"result{str(i).zfill(3)}.json")
-                with open(pred_path, "r") as f:
-                    result = json.load(f)
-                predictions.append(result["stage3"])
-            except (FileNotFoundError, json.JSONDecodeError):
-                predictions.append("")
-        
-        # Calculate metrics
-        metrics = {
-            'bert_score': self.calculate_bert_score(predictions, references) * 100,
-            'token_f1': self.calculate_token_f1(predictions, references) * 100
-        }
-        
-        rouge_scores = self.calculate_rouge_scores(predictions, references)
-        metrics.update({
-            'rouge1': rouge_scores['rouge1'] * 100,
-            'rouge2': rouge_scores['rouge2'] * 100,
-            'rougeL': rouge_scores['rougeL'] * 100
-        })
-        
-        return metrics
\ No newline at end of file
+
+        predictions = self.load_predictions(output_dir, len(references))
+        return self.score_predictions(predictions, references, dataset_type, output_dir)
@@ -0,0 +1,65 @@
+# TIDES/src/evaluation/prompts.py
+import threading
+from typing import Any, Dict, List, Union
+
+Messages = List[Dict[str, str]]
+
+class PromptTemplate:
+    """A stage prompt split into a static instruction prefix and a variable user turn.
+
+    In chat mode the instruction is sent as the system message, byte-identical on every
+    call, so providers with prefix caching can reuse it. Legacy mode renders the single
+    user string the pipeline originally sent.
+    """
+
+    def __init__(self, stage: str, instruction: str, user_template: str):
+        self.stage = stage
+        self.instruction = instruction
+        self.user_template = user_template
+
+    def render(self, chat: bool = True, **fields: Any) -> Union[Messages, str]:
+        user = self.user_template.format(**fields)
+        if not chat:
+            return f"{self.instruction}\n{user}"
+        return [
+            {'role': 'system', 'content': self.instruction},
+            {'role': 'user', 'content': user}
+        ]
+
+def build_templates(instructions: Dict[str, str]) -> Dict[str, PromptTemplate]:
+    return {
+        'step1': PromptTemplate(
+            'step1', instructions['step1'],
+            "###Question: {question}\n###Paragraph: {document}\n###Output: "
+        ),
+        'step1_batch': PromptTemplate(
+            'step1_batch', instructions['step1_batch'],
+            "###Question: {question}\n###Paragraphs:\n{paragraphs}\n###Output: "
+        ),
+        'step2': PromptTemplate(
+            'step2', instructions['step2'],
+            "###Question: {question}\n###Context: {document}\n###Relevant excerpt: "
+        ),
+        'step3': PromptTemplate(
+            'step3', instructions['step3'],
+            "Question: {question}\nContext: {context}\nOutput: {{answer summary}}"
+        )
+    }
+
+class PromptUsage:
+    """Thread-safe per-question tally of prompt tokens by stage, split into cacheable prefix and variable part."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, prefix_tokens: int, variable_tokens: int) -> None:
+        with self._lock:
+            counts = self.stages.setdefault(stage, {'calls': 0, 'prefix_tokens': 0, 'variable_tokens': 0})
+            counts['calls'] += 1
+            counts['prefix_tokens'] += prefix_tokens
+            counts['variable_tokens'] += variable_tokens
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {stage: dict(counts) for stage, counts in self.stages.items()}
@@ -0,0 +1,52 @@
+# TIDES/src/evaluation/score_cache.py
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class ScoreCache:
+    """Sidecar JSON of per-(prediction, reference, metric) scores for incremental evaluation.
+
+    Pairs are keyed by a SHA-1 of the prediction and reference text, so a result file
+    that is unchanged since the last evaluation is a cache hit and a rewritten one is
+    a miss. Metric names include whatever identifies the scorer, such as the BERTScore
+    model, so changing the scorer invalidates only that metric.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.scores: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.logger = logging.getLogger(__name__)
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.scores = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning(f"Ignoring unreadable score cache {self.path}: {str(e)}")
+
+    @staticmethod
+    def pair_key(prediction: str, reference: str) -> str:
+        return hashlib.sha1(f'{prediction}\0{reference}'.encode('utf-8')).hexdigest()
+
+    def get(self, prediction: str, reference: str, metric: str) -> Optional[Any]:
+        return self.scores.get(self.pair_key(prediction, reference), {}).get(metric)
+
+    def contains(self, prediction: str, reference: str, metric: str) -> bool:
+        return metric in self.scores.get(self.pair_key(prediction, reference), {})
+
+    def put(self, prediction: str, reference: str, metric: str, value: Any) -> None:
+        self.scores.setdefault(self.pair_key(prediction, reference), {})[metric] = value
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.scores, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -4,14 +4,25 @@ Document retrieval modules for TIDES
 """
 from .retriever import (
     BaseRetriever,
+    TFIDFIndexRetriever,
     TFIDFRetriever,
     CosineRetriever,
+    BM25Retriever,
+    InvertedIndexRetriever,
     get_retriever
 )
+from .retrieval_cache import RetrievalCache
+from .tokenizer import PreprocessCache, get_tokenizer
 
 __all__ = [
     'BaseRetriever',
+    'TFIDFIndexRetriever',
     'TFIDFRetriever', 
     'CosineRetriever',
-    'get_retriever'
+    'BM25Retriever',
+    'InvertedIndexRetriever',
+    'get_retriever',
+    'RetrievalCache',
+    'PreprocessCache',
+    'get_tokenizer'
 ]
\ No newline at end of file
@@ -0,0 +1,287 @@
+# TIDES/src/retrieval/dense.py
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from .retriever import BaseRetriever
+
+class SentenceEncoder:
+    """Mean-pooled, L2-normalised sentence embeddings from a local transformers model on CPU.
+
+    torch and transformers are imported on first use. The model is loaded with
+    local_files_only, so it must already be in the Hugging Face cache (or model_name
+    must be a local directory); a run never downloads it. Texts are encoded in
+    length-sorted batches so each batch pads to similar lengths.
+    """
+
+    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2', batch_size: int = 32,
+                 max_length: int = 256, device: str = 'cpu'):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self._tokenizer = None
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            from transformers import AutoModel, AutoTokenizer
+            try:
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, local_files_only=True)
+                self._model = AutoModel.from_pretrained(self.model_name, local_files_only=True)
+            except OSError as e:
+                raise RuntimeError(
+                    f"Dense encoder {self.model_name} is not available locally. Download it once with "
+                    f"`huggingface-cli download {self.model_name}` or point retrieval.dense.model_name "
+                    f"at a local model directory."
+                ) from e
+            self._model = self._model.to(self.device).eval()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        import torch
+
+        self._load()
+        embeddings = np.zeros((len(texts), self._model.config.hidden_size), dtype=np.float32)
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                batch_idx = order[start:start + self.batch_size]
+                batch = self._tokenizer(
+                    [texts[i] for i in batch_idx],
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length,
+                    return_tensors='pt'
+                ).to(self.device)
+                hidden = self._model(**batch).last_hidden_state
+                mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                embeddings[batch_idx] = torch.nn.functional.normalize(pooled, dim=1).cpu().numpy()
+        return embeddings
+
+def quantize(embeddings: np.ndarray, quantization: str):
+    """Return (stored vectors, per-row scales or None) for 'float16' or symmetric per-row 'int8'."""
+    if quantization == 'float16':
+        return embeddings.astype(np.float16), None
+    if quantization == 'int8':
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(embeddings / scales[:, np.newaxis]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantization: {quantization}")
+
+class DenseIndex:
+    """Quantised embedding matrix with an optional IVF (inverted file) coarse index.
+
+    Vectors are stored as float16 or int8 with per-row scales and memory-mapped on
+    load. Corpora with at least ``min_ivf_docs`` vectors get spherical k-means
+    centroids; a query then scores only the vectors in its ``nprobe`` nearest lists.
+    Smaller corpora, and queries whose probed lists hold fewer than top_k vectors, use
+    exact brute-force search in fixed-size chunks.
+    """
+    CHUNK_ROWS = 65536
+
+    def __init__(self, vectors, scales=None, centroids=None, list_offsets=None, list_ids=None):
+        self.vectors = vectors
+        self.scales = scales
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(cls, chunks: Iterable[np.ndarray], num_vectors: int, quantization: str = 'int8',
+              min_ivf_docs: int = 4096, seed: int = 0) -> 'DenseIndex':
+        vectors = scales = None
+        pos = 0
+        for chunk in chunks:
+            stored, chunk_scales = quantize(chunk, quantization)
+            if vectors is None:
+                vectors = np.zeros((num_vectors, chunk.shape[1]), dtype=stored.dtype)
+                scales = np.ones(num_vectors, dtype=np.float32) if chunk_scales is not None else None
+            vectors[pos:pos + len(chunk)] = stored
+            if scales is not None:
+                scales[pos:pos + len(chunk)] = chunk_scales
+            pos += len(chunk)
+        if vectors is None:
+            vectors = np.zeros((0, 1), dtype=np.float16)
+        index = cls(vectors, scales)
+        if num_vectors >= min_ivf_docs:
+            index.train_ivf(seed=seed)
+        return index
+
+    def dequantize(self, rows) -> np.ndarray:
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= np.asarray(self.scales[rows])[:, np.newaxis]
+        return block
+
+    def train_ivf(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 32768,
+                  seed: int = 0) -> None:
+        num_vectors = len(self)
+        nlist = nlist or max(1, int(np.sqrt(num_vectors)))
+        rng = np.random.default_rng(seed)
+        sample = self.dequantize(np.sort(rng.choice(num_vectors, min(num_vectors, sample_size), replace=False)))
+        centroids = sample[rng.choice(len(sample), min(nlist, len(sample)), replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            nonempty = norms > 0
+            centroids[nonempty] = sums[nonempty] / norms[nonempty, np.newaxis]
+
+        assignment = np.empty(num_vectors, dtype=np.int64)
+        for start in range(0, num_vectors, self.CHUNK_ROWS):
+            rows = slice(start, min(start + self.CHUNK_ROWS, num_vectors))
+            assignment[rows] = np.argmax(self.dequantize(rows) @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.list_ids = np.argsort(assignment, kind='stable')
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+
+    def exact_scores(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.CHUNK_ROWS):
+            rows = slice(start, min(start + self.CHUNK_ROWS, len(self)))
+            scores[:, rows] = queries @ self.dequantize(rows).T
+        return scores
+
+    def search(self, queries: np.ndarray, top_k: int, nprobe: int = 8) -> List[tuple]:
+        """Per query, (indices, scores) of the top_k vectors by inner product, best first."""
+        if self.centroids is None:
+            scores = self.exact_scores(queries)
+            top = BaseRetriever.top_k_indices(scores, top_k)
+            return [(row_top, scores[row, row_top]) for row, row_top in enumerate(top)]
+
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([
+                self.list_ids[self.list_offsets[lst]:self.list_offsets[lst + 1]] for lst in lists
+            ])
+            if len(candidates) < min(top_k, len(self)):
+                scores = self.exact_scores(query[np.newaxis, :])[0]
+                candidates = np.arange(len(self))
+            else:
+                candidates.sort()
+                scores = self.dequantize(candidates) @ query
+            top = BaseRetriever.top_k_indices(scores[np.newaxis, :], top_k)[0]
+            results.append((candidates[top], scores[top]))
+        return results
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        return (Path(index_dir) / 'meta.json').exists()
+
+    def save(self, index_dir: Path) -> None:
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        np.save(index_dir / 'vectors.npy', self.vectors)
+        arrays = {'scales': self.scales, 'centroids': self.centroids,
+                  'list_offsets': self.list_offsets, 'list_ids': self.list_ids}
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(index_dir / f'{name}.npy', array)
+        # meta.json is written last and marks the index as complete
+        with open(index_dir / 'meta.json', 'w') as f:
+            json.dump({'num_vectors': len(self), 'arrays': [n for n, a in arrays.items() if a is not None]}, f)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> 'DenseIndex':
+        index_dir = Path(index_dir)
+        with open(index_dir / 'meta.json', 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(index_dir / f'{name}.npy', mmap_mode='r') for name in meta['arrays']}
+        return cls(np.load(index_dir / 'vectors.npy', mmap_mode='r'), **arrays)
+
+class DenseRetriever(BaseRetriever):
+    """Embedding retriever over a quantised, memory-mapped DenseIndex reused across runs."""
+    name = 'dense'
+
+    def __init__(self, index_dir=None, model_name='sentence-transformers/all-MiniLM-L6-v2',
+                 quantization='int8', nprobe=8, batch_size=32, max_length=256, min_ivf_docs=4096,
+                 encode_chunk=1024, **kwargs):
+        super().__init__(**kwargs)
+        self.encoder = SentenceEncoder(model_name, batch_size=batch_size, max_length=max_length)
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.quantization = quantization
+        self.nprobe = nprobe
+        self.min_ivf_docs = min_ivf_docs
+        self.encode_chunk = encode_chunk
+        self.index = None
+        self._indexed_documents = None
+        self._fingerprint = None
+        self.logger = logging.getLogger(__name__)
+
+    def index_params(self):
+        """Settings that change the stored embeddings or index layout; part of the on-disk index key."""
+        return {'max_length': self.encoder.max_length, 'min_ivf_docs': self.min_ivf_docs}
+
+    def _index_path(self, fingerprint: str) -> Optional[Path]:
+        if self.index_dir is None:
+            return None
+        model_slug = self.encoder.model_name.replace('/', '--')
+        params = hashlib.sha1(json.dumps(self.index_params(), sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        return self.index_dir / f'{self.name}_{model_slug}_{self.quantization}_{fingerprint[:16]}_{params}'
+
+    def _embedding_chunks(self, documents) -> Iterator[np.ndarray]:
+        buffer = []
+        for text in self.iter_document_texts(documents):
+            buffer.append(text)
+            if len(buffer) >= self.encode_chunk:
+                yield self.encoder.encode(buffer)
+                buffer = []
+        if buffer:
+            yield self.encoder.encode(buffer)
+
+    def build_index(self, documents):
+        if documents is self._indexed_documents:
+            return
+        fingerprint = self.corpus_fingerprint(self.iter_document_texts(documents))
+        if fingerprint != self._fingerprint:
+            path = self._index_path(fingerprint)
+            if path is not None and DenseIndex.exists(path):
+                self.index = DenseIndex.load(path)
+                self.logger.info(f"Loaded dense index from {path}")
+            else:
+                self.index = DenseIndex.build(
+                    self._embedding_chunks(documents),
+                    len(documents),
+                    quantization=self.quantization,
+                    min_ivf_docs=self.min_ivf_docs
+                )
+                if path is not None:
+                    self.index.save(path)
+        self._fingerprint = fingerprint
+        self._indexed_documents = documents
+
+    def score_queries(self, queries, documents):
+        try:
+            self.build_index(documents)
+            return self.index.exact_scores(self.encoder.encode(list(queries)))
+
+        except Exception as e:
+            self.logger.error(f"Error in dense retrieval: {str(e)}")
+            raise
+
+    def retrieve_batch(self, queries, documents, top_k=30):
+        try:
+            self.build_index(documents)
+            matches = self.index.search(self.encoder.encode(list(queries)), top_k, self.nprobe)
+            return [
+                {
+                    'indices': indices.tolist(),
+                    'scores': scores.astype(np.float64).tolist()
+                }
+                for indices, scores in matches
+            ]
+
+        except Exception as e:
+            self.logger.error(f"Error in dense retrieval: {str(e)}")
+            raise
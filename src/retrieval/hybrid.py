@@ -0,0 +1,121 @@
+# TIDES/src/retrieval/hybrid.py
+import logging
+
+import numpy as np
+
+from .dense import DenseRetriever
+from .retriever import BaseRetriever, get_retriever
+
+FUSION_METHODS = ('rrf', 'linear')
+
+def reciprocal_rank_fusion(pool, rankings, k=60, depth=100):
+    """Sum of 1 / (k + rank) over the top `depth` ranks of each ranking, for the sorted doc ids in pool."""
+    fused = np.zeros(len(pool), dtype=np.float64)
+    for ranking in rankings:
+        ranking = np.asarray(ranking)[:depth]
+        fused[np.searchsorted(pool, ranking)] += 1.0 / (k + np.arange(1, len(ranking) + 1, dtype=np.float64))
+    return fused
+
+def linear_fusion(score_vectors, weights):
+    """Weighted sum of min-max normalised score vectors over the same pool."""
+    fused = np.zeros(len(score_vectors[0]), dtype=np.float64)
+    for scores, weight in zip(score_vectors, weights):
+        scores = np.asarray(scores, dtype=np.float64)
+        low = scores.min() if len(scores) else 0.0
+        spread = (scores.max() - low) if len(scores) else 0.0
+        fused += weight * (scores - low) / (spread or 1.0)
+    return fused
+
+class HybridRetriever(BaseRetriever):
+    """Fuses a lexical retriever and the dense retriever over a per-query candidate pool.
+
+    The pool is the lexical top ``pool_depth`` joined with the dense index's ANN top
+    ``pool_depth`` (IVF search), so neither side scores the whole corpus densely. Only
+    hits with a positive score enter the pool: the lexical top list of a query with few
+    matching terms is otherwise padded with zero-score documents that would earn rank
+    credit. 'rrf' (reciprocal rank fusion) ignores score scales; 'linear' mixes min-max
+    normalised scores with weight ``alpha`` on the dense side. For linear fusion,
+    dense scores are computed exactly for every pooled document, and pooled documents
+    outside the lexical top list get the lowest listed lexical score (0 when the list
+    holds every lexical hit).
+    """
+    name = 'hybrid'
+
+    def __init__(self, index_dir=None, lexical='bm25', fusion='rrf', rrf_k=60, rrf_depth=100,
+                 alpha=0.5, pool_depth=100, dense=None, **kwargs):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unsupported fusion method: {fusion}")
+        super().__init__(**kwargs)
+        self.lexical = get_retriever(lexical, index_dir=index_dir, **kwargs)
+        self.dense = DenseRetriever(index_dir=index_dir, **(dense or {}), **kwargs)
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.rrf_depth = rrf_depth
+        self.alpha = alpha
+        self.pool_depth = pool_depth
+        self.logger = logging.getLogger(__name__)
+
+    def build_index(self, documents):
+        self.lexical.build_index(documents)
+        self.dense.build_index(documents)
+
+    def _fused_pools(self, queries, documents, depth):
+        """Per query, the sorted candidate pool and its fused scores."""
+        queries = list(queries)
+        lexical = self.lexical.retrieve_batch(queries, documents, depth)
+        self.dense.build_index(documents)
+        query_vectors = self.dense.encoder.encode(queries)
+        dense = self.dense.index.search(query_vectors, depth, self.dense.nprobe)
+
+        pools = []
+        for lex, (dense_ids, dense_scores), query_vector in zip(lexical, dense, query_vectors):
+            lexical_scores = np.asarray(lex['scores'], dtype=np.float64)
+            lexical_ids = np.asarray(lex['indices'], dtype=np.int64)[lexical_scores > 0]
+            lexical_scores = lexical_scores[lexical_scores > 0]
+            dense_ids = np.asarray(dense_ids, dtype=np.int64)[np.asarray(dense_scores) > 0]
+            pool = np.union1d(lexical_ids, dense_ids)
+            if self.fusion == 'rrf':
+                fused = reciprocal_rank_fusion(pool, [lexical_ids, dense_ids], self.rrf_k, self.rrf_depth)
+            else:
+                # A list shorter than depth holds every lexical hit, so the rest of the pool scores 0
+                fill = lexical_scores.min() if len(lexical_scores) >= depth else 0.0
+                pooled_lexical = np.full(len(pool), fill)
+                pooled_lexical[np.searchsorted(pool, lexical_ids)] = lexical_scores
+                dense_scores = self.dense.index.dequantize(pool) @ query_vector
+                fused = linear_fusion([pooled_lexical, dense_scores], (1.0 - self.alpha, self.alpha))
+            pools.append((pool, fused))
+        return pools
+
+    def score_queries(self, queries, documents):
+        """Fused scores as a Q x D matrix; documents outside a query's pool score 0."""
+        try:
+            pools = self._fused_pools(queries, documents, self.pool_depth)
+            scores = np.zeros((len(pools), len(documents)), dtype=np.float64)
+            for row, (pool, fused) in enumerate(pools):
+                scores[row, pool] = fused
+            return scores
+
+        except Exception as e:
+            self.logger.error(f"Error in hybrid retrieval: {str(e)}")
+            raise
+
+    def retrieve_batch(self, queries, documents, top_k=30):
+        try:
+            results = []
+            for pool, fused in self._fused_pools(queries, documents, max(top_k, self.pool_depth)):
+                top = self.top_k_indices(fused[np.newaxis, :], top_k)[0]
+                indices, scores = pool[top].tolist(), fused[top].tolist()
+                # Pools smaller than top_k are padded after fusion with zero-score documents, like the other retrievers
+                missing = min(top_k, len(documents)) - len(indices)
+                if missing > 0:
+                    indices += np.setdiff1d(np.arange(top_k + len(pool)), pool)[:missing].tolist()
+                    scores += [0.0] * missing
+                results.append({
+                    'indices': indices,
+                    'scores': scores
+                })
+            return results
+
+        except Exception as e:
+            self.logger.error(f"Error in hybrid retrieval: {str(e)}")
+            raise
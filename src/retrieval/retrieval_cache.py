@@ -0,0 +1,103 @@
+# TIDES/src/retrieval/retrieval_cache.py
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .retriever import BaseRetriever
+
+class RetrievalCache:
+    """Per-question top-k results for one dataset and retriever, stored in a single .npz file.
+
+    The file carries a key hashed from the corpus fingerprint and the retriever
+    parameters. A file whose key differs, or whose stored depth is below the requested
+    top_k, is treated as stale and rewritten. Rows are looked up by a SHA-1 of the
+    query text, so runs over any slice of the questions share one file.
+    """
+
+    def __init__(self, path: Path, key: str):
+        self.path = Path(path)
+        self.key = key
+        self.top_k = 0
+        self.entries: Dict[str, Dict[str, List]] = {}
+        self.logger = logging.getLogger(__name__)
+        self._load()
+
+    @staticmethod
+    def make_key(documents, params: Dict[str, Any]) -> str:
+        fingerprint = BaseRetriever.corpus_fingerprint(BaseRetriever.iter_document_texts(documents))
+        payload = json.dumps({'corpus': fingerprint, 'params': params}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return hashlib.sha1(query.encode('utf-8')).hexdigest()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data['key']) != self.key:
+                    self.logger.info(f"Retrieval cache {self.path} is stale; it will be rebuilt")
+                    return
+                self.top_k = int(data['top_k'])
+                for query_key, indices, scores, length in zip(
+                        data['query_keys'], data['indices'], data['scores'], data['lengths']):
+                    self.entries[str(query_key)] = {
+                        'indices': indices[:length].tolist(),
+                        'scores': scores[:length].tolist()
+                    }
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable retrieval cache {self.path}: {str(e)}")
+            self.top_k = 0
+            self.entries = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        rows = len(self.entries)
+        indices = np.full((rows, self.top_k), -1, dtype=np.int32)
+        scores = np.zeros((rows, self.top_k), dtype=np.float64)
+        lengths = np.zeros(rows, dtype=np.int32)
+        for row, entry in enumerate(self.entries.values()):
+            length = len(entry['indices'])
+            indices[row, :length] = entry['indices']
+            scores[row, :length] = entry['scores']
+            lengths[row] = length
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                key=np.array(self.key),
+                top_k=np.array(self.top_k),
+                query_keys=np.array(list(self.entries), dtype='U40'),
+                indices=indices,
+                scores=scores,
+                lengths=lengths
+            )
+        os.replace(tmp_path, self.path)
+
+    def retrieve_batch(self, retriever: BaseRetriever, queries: List[str], documents, top_k: int) -> List[Dict[str, List]]:
+        """retriever.retrieve_batch with cached rows reused; only missing queries reach the retriever."""
+        if top_k > self.top_k:
+            self.entries = {}
+            self.top_k = top_k
+        keys = [self.query_key(query) for query in queries]
+        missing = [i for i, key in enumerate(keys) if key not in self.entries]
+        if missing:
+            fresh = retriever.retrieve_batch([queries[i] for i in missing], documents, self.top_k)
+            for i, result in zip(missing, fresh):
+                self.entries[keys[i]] = result
+            self.save()
+        self.logger.info(f"Retrieval cache: {len(queries) - len(missing)} of {len(queries)} queries reused")
+        return [
+            {
+                'indices': self.entries[key]['indices'][:top_k],
+                'scores': self.entries[key]['scores'][:top_k]
+            }
+            for key in keys
+        ]
@@ -1,100 +1,415 @@
 # TIDES/src/retrieval/retriever.py
 from abc import ABC, abstractmethod
+import hashlib
+import json
+import pickle
+from collections.abc import Mapping
+from pathlib import Path
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import nltk
-from nltk.corpus import stopwords
 import logging
 
+from ..data.corpus_store import LazyCorpus
+from .tokenizer import english_stopwords, ensure_nltk_resource, get_tokenizer, get_preprocess_cache, tokenizer_key
+
 class BaseRetriever(ABC):
-    def __init__(self):
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        self.stop_words = set(stopwords.words('english'))
+    def __init__(self, tokenizer='regex', cache_dir=None):
+        if tokenizer == 'nltk':
+            ensure_nltk_resource('punkt', 'tokenizers/punkt')
+        self.stop_words = english_stopwords()
+        self.tokenizer_name = tokenizer
+        self.tokenize = get_tokenizer(tokenizer)
+        self.preprocess_cache = get_preprocess_cache(tokenizer, cache_dir)
         
     def preprocess_text(self, text):
-        text = text.lower()
-        tokens = nltk.word_tokenize(text)
-        tokens = [token for token in tokens if token not in self.stop_words]
-        return ' '.join(tokens)
+        return self.preprocess_cache.get_or_compute(text, self._normalize)
+
+    def _normalize(self, text):
+        stop_words = self.stop_words
+        return ' '.join(token for token in self.tokenize(text.lower()) if token not in stop_words)
+
+    def save_cache(self):
+        self.preprocess_cache.save()
         
     @abstractmethod
-    def retrieve_documents(self, query, documents, top_k):
+    def score_queries(self, queries, documents):
+        """Return a dense (len(queries), len(documents)) array of relevance scores."""
         pass
-        
+
+    def retrieve_documents(self, query, documents, top_k=30):
+        return self.retrieve_batch([query], documents, top_k)[0]
+
+    def retrieve_batch(self, queries, documents, top_k=30):
+        scores = np.asarray(self.score_queries(queries, documents), dtype=np.float64)
+        top_indices = self.top_k_indices(scores, top_k)
+        top_scores = np.take_along_axis(scores, top_indices, axis=1)
+        return [
+            {
+                'indices': indices.tolist(),
+                'scores': row_scores.tolist()
+            }
+            for indices, row_scores in zip(top_indices, top_scores)
+        ]
+
+    @staticmethod
+    def top_k_indices(scores, top_k):
+        """Per-row indices of the top_k scores, highest first, via argpartition."""
+        num_docs = scores.shape[1]
+        top_k = min(top_k, num_docs)
+        if top_k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        if top_k < num_docs:
+            candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        else:
+            candidates = np.tile(np.arange(num_docs), (scores.shape[0], 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def document_texts(self, documents):
+        """Flatten a corpus (list of texts, or mapping of id -> text / {'title', 'text'}) into texts."""
+        return list(self.iter_document_texts(documents))
+
+    @staticmethod
+    def corpus_fingerprint(texts):
+        digest = hashlib.sha1()
+        for text in texts:
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    @staticmethod
+    def iter_document_texts(documents):
+        if isinstance(documents, Mapping):
+            documents = documents.values()
+        for doc in documents:
+            if isinstance(doc, dict):
+                doc = f"{doc.get('title', '')}. {doc.get('text', '')}"
+            yield doc
+
     def save_results(self, results, output_path):
         with open(output_path, 'w') as f:
             json.dump(results, f, indent=2)
 
-class TFIDFRetriever(BaseRetriever):
-    def __init__(self):
-        super().__init__()
-        self.vectorizer = TfidfVectorizer(
+class TFIDFIndexRetriever(BaseRetriever):
+    """Retriever backed by a TF-IDF corpus index that is fitted once and reused across queries.
+
+    The fitted vectorizer and sparse document matrix are kept in memory and, when
+    ``index_dir`` is given, pickled to disk keyed by a fingerprint of the corpus so
+    later runs over the same corpus skip fitting entirely. Queries are scored against
+    ``term_matrix``, a term-major (CSR, terms x documents) copy made once per index, so
+    the product does not transpose the whole corpus on every call.
+    """
+    name = 'tfidf'
+
+    def __init__(self, index_dir=None, **kwargs):
+        super().__init__(**kwargs)
+        self.vectorizer = None
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.doc_matrix = None
+        self.term_matrix = None
+        self._indexed_documents = None
+        self._fingerprint = None
+
+    def build_index(self, documents):
+        if documents is self._indexed_documents:
+            return
+        # Two streaming passes instead of holding every raw text, so lazily loaded corpora stay bounded
+        fingerprint = self.corpus_fingerprint(self.iter_document_texts(documents))
+        if fingerprint != self._fingerprint:
+            if not self._load_index(fingerprint):
+                # The preprocess cache would hold (and pickle) every normalized text of a lazily loaded corpus
+                preprocess = self._normalize if isinstance(documents, LazyCorpus) else self.preprocess_text
+                self.doc_matrix = self._fit(preprocess(doc) for doc in self.iter_document_texts(documents))
+                self.save_cache()
+                self._save_index(fingerprint)
+            self.term_matrix = self.doc_matrix.T.tocsr()
+            self.term_matrix.sort_indices()
+        self._fingerprint = fingerprint
+        self._indexed_documents = documents
+
+    def _make_vectorizer(self):
+        # sklearn is imported only when an index is actually fitted
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(
             stop_words='english',
             strip_accents='unicode',
             lowercase=True
         )
-        
-    def retrieve_documents(self, query, documents, top_k=30):
+
+    def _fit(self, processed_docs):
+        self.vectorizer = self._make_vectorizer()
+        return self.vectorizer.fit_transform(processed_docs)
+
+    def index_params(self):
+        """Scoring parameters baked into the fitted index; part of the on-disk index key."""
+        return {}
+
+    def _index_state(self):
+        return {}
+
+    def _restore_index_state(self, index):
+        pass
+
+    def _index_path(self, fingerprint):
+        key = fingerprint[:16]
+        params = self.index_params()
+        if params:
+            key += '_' + hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        return self.index_dir / f'{self.name}_{tokenizer_key(self.tokenizer_name)}_{key}.pkl'
+
+    def _load_index(self, fingerprint):
+        if self.index_dir is None or not self._index_path(fingerprint).exists():
+            return False
         try:
-            processed_docs = [self.preprocess_text(doc) for doc in documents]
-            processed_query = self.preprocess_text(query)
-            
-            tfidf_matrix = self.vectorizer.fit_transform(processed_docs)
-            query_vector = self.vectorizer.transform([processed_query])
-            
-            similarity_scores = (query_vector @ tfidf_matrix.T).toarray().flatten()
-            
-            top_indices = similarity_scores.argsort()[-top_k:][::-1]
-            
-            return {
-                'indices': top_indices.tolist(),
-                'scores': similarity_scores[top_indices].tolist()
-            }
+            with open(self._index_path(fingerprint), 'rb') as f:
+                index = pickle.load(f)
+            self.vectorizer = index['vectorizer']
+            self.doc_matrix = index['doc_matrix']
+            self._restore_index_state(index)
+            logging.info(f"Loaded {self.name} index from {self._index_path(fingerprint)}")
+            return True
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable {self.name} index: {str(e)}")
+            return False
+
+    def _save_index(self, fingerprint):
+        if self.index_dir is None:
+            return
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            with open(self._index_path(fingerprint), 'wb') as f:
+                pickle.dump({'vectorizer': self.vectorizer, 'doc_matrix': self.doc_matrix, **self._index_state()}, f)
+        except Exception as e:
+            logging.warning(f"Could not save {self.name} index: {str(e)}")
+
+class TFIDFRetriever(TFIDFIndexRetriever):
+    name = 'tfidf'
+
+    def score_queries(self, queries, documents):
+        try:
+            self.build_index(documents)
+            query_matrix = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            return (query_matrix @ self.term_matrix).toarray()
             
         except Exception as e:
             logging.error(f"Error in TF-IDF retrieval: {str(e)}")
             raise
 
-class CosineRetriever(BaseRetriever):
-    
-    def __init__(self):
-        super().__init__()
-        self.vectorizer = TfidfVectorizer(
+class CosineRetriever(TFIDFIndexRetriever):
+    name = 'cosine'
+
+    def score_queries(self, queries, documents):
+        try:
+            self.build_index(documents)
+            from sklearn.metrics.pairwise import cosine_similarity
+            query_matrix = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            return cosine_similarity(query_matrix, self.doc_matrix)
+            
+        except Exception as e:
+            logging.error(f"Error in cosine similarity retrieval: {str(e)}")
+            raise
+
+class BM25Retriever(TFIDFIndexRetriever):
+    """Okapi BM25 with all document statistics precomputed into one sparse weight matrix.
+
+    At fit time the raw term counts, document lengths and IDF table are folded into
+    W[d, t] = idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avgdl)),
+    so scoring a batch of queries is a single sparse product of their term counts
+    with W (held term-major). IDF uses the non-negative log(1 + (N - n + 0.5) / (n + 0.5)) form.
+    """
+    name = 'bm25'
+
+    def __init__(self, index_dir=None, k1=1.5, b=0.75, **kwargs):
+        super().__init__(index_dir=index_dir, **kwargs)
+        self.k1 = k1
+        self.b = b
+        self.idf = None
+        self.doc_lengths = None
+
+    def index_params(self):
+        return {'k1': self.k1, 'b': self.b}
+
+    def _make_vectorizer(self):
+        from sklearn.feature_extraction.text import CountVectorizer
+        return CountVectorizer(
             stop_words='english',
             strip_accents='unicode',
             lowercase=True
         )
-        
-    def retrieve_documents(self, query, documents, top_k=30):
+
+    def _fit(self, processed_docs):
+        self.vectorizer = self._make_vectorizer()
+        counts = self.vectorizer.fit_transform(processed_docs).tocsr().astype(np.float64)
+        num_docs = counts.shape[0]
+        self.doc_lengths = np.asarray(counts.sum(axis=1)).ravel()
+        avg_length = self.doc_lengths.mean() if num_docs else 0.0
+        doc_freq = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf = np.log1p((num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        # Per-nonzero length normalisation, expanded from per-row document lengths
+        row_lengths = np.repeat(self.doc_lengths, np.diff(counts.indptr))
+        norm = self.k1 * (1 - self.b + self.b * row_lengths / max(avg_length, 1e-9))
+        weights = counts.copy()
+        weights.data = self.idf[counts.indices] * counts.data * (self.k1 + 1) / (counts.data + norm)
+        return weights
+
+    def _index_state(self):
+        return {'idf': self.idf, 'doc_lengths': self.doc_lengths}
+
+    def _restore_index_state(self, index):
+        self.idf = index.get('idf')
+        self.doc_lengths = index.get('doc_lengths')
+
+    def score_queries(self, queries, documents):
         try:
-            processed_docs = [self.preprocess_text(doc) for doc in documents]
-            processed_query = self.preprocess_text(query)
-            
-            doc_vectors = self.vectorizer.fit_transform(processed_docs)
-            query_vector = self.vectorizer.transform([processed_query])
-            
-            similarity_scores = cosine_similarity(query_vector, doc_vectors)[0]
-            
-            top_indices = similarity_scores.argsort()[-top_k:][::-1]
-            
-            return {
-                'indices': top_indices.tolist(),
-                'scores': similarity_scores[top_indices].tolist()
-            }
-            
+            self.build_index(documents)
+            query_counts = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            return (query_counts @ self.term_matrix).toarray()
+
         except Exception as e:
-            logging.error(f"Error in cosine similarity retrieval: {str(e)}")
+            logging.error(f"Error in BM25 retrieval: {str(e)}")
             raise
 
-def get_retriever(method):
+class InvertedIndexRetriever(TFIDFIndexRetriever):
+    """TF-IDF retriever that scores through postings lists with MaxScore-style pruning.
+
+    The term-major matrix doubles as the term -> (doc, weight) postings, alongside a
+    per-term maximum weight. A query walks its terms in decreasing order of
+    score upper bound; once the bound of the unvisited terms drops below the current
+    k-th best score, no unseen document can reach the top-k. From then on each
+    remaining term is only looked up for the surviving candidates (binary search in its
+    sorted postings), and candidates that cannot reach the k-th best score are dropped.
+    Scores are kept per candidate, so no per-query work is proportional to the corpus
+    size. Rankings match TFIDFRetriever up to floating-point ties.
+    """
+    name = 'inverted'
+
+    def __init__(self, index_dir=None, **kwargs):
+        super().__init__(index_dir=index_dir, **kwargs)
+        self.postings = None
+        self.term_bounds = None
+        self._postings_fingerprint = None
+
+    def build_index(self, documents):
+        super().build_index(documents)
+        if self._postings_fingerprint == self._fingerprint:
+            return
+        postings = self.term_matrix
+        term_bounds = np.zeros(postings.shape[0])
+        nonempty = np.diff(postings.indptr) > 0
+        if nonempty.any():
+            term_bounds[nonempty] = np.maximum.reduceat(postings.data, postings.indptr[:-1][nonempty])
+        self.postings = postings
+        self.term_bounds = term_bounds
+        self._postings_fingerprint = self._fingerprint
+
+    def score_queries(self, queries, documents):
+        try:
+            self.build_index(documents)
+            query_matrix = self.vectorizer.transform([self.preprocess_text(query) for query in queries])
+            return (query_matrix @ self.term_matrix).toarray()
+
+        except Exception as e:
+            logging.error(f"Error in inverted index retrieval: {str(e)}")
+            raise
+
+    def retrieve_batch(self, queries, documents, top_k=30):
+        try:
+            self.build_index(documents)
+            query_matrix = self.vectorizer.transform([self.preprocess_text(query) for query in queries]).tocsr()
+            results = []
+            for row in range(query_matrix.shape[0]):
+                start, end = query_matrix.indptr[row], query_matrix.indptr[row + 1]
+                results.append(self._retrieve_pruned(query_matrix.indices[start:end], query_matrix.data[start:end], top_k))
+            return results
+
+        except Exception as e:
+            logging.error(f"Error in inverted index retrieval: {str(e)}")
+            raise
+
+    def _retrieve_pruned(self, terms, weights, top_k):
+        num_docs = self.postings.shape[1]
+        top_k = min(top_k, num_docs)
+        if top_k <= 0:
+            return {'indices': [], 'scores': []}
+        bounds = weights * self.term_bounds[terms]
+        remaining = bounds.sum()
+        # Scores live in candidate-sized arrays (doc ids kept sorted), never in corpus-sized buffers
+        candidates = np.empty(0, dtype=self.postings.indices.dtype)
+        scores = np.empty(0)
+        admitting = True
+
+        for pos in np.argsort(-bounds, kind='stable'):
+            term = terms[pos]
+            start, end = self.postings.indptr[term], self.postings.indptr[term + 1]
+            docs = self.postings.indices[start:end]
+            contributions = weights[pos] * self.postings.data[start:end]
+            # Clamped so rounding can't push the bound below zero and drop the k-th best itself
+            remaining = max(remaining - bounds[pos], 0.0)
+            if admitting:
+                candidates, scores = self._merge_postings(candidates, scores, docs, contributions)
+            else:
+                self._add_to_candidates(candidates, scores, docs, contributions)
+
+            if len(candidates) >= top_k:
+                threshold = np.partition(scores, len(scores) - top_k)[-top_k]
+                # No unseen document can reach the top-k any more, and candidates that cannot
+                # reach the k-th best score even with every remaining term are dropped
+                admitting = admitting and remaining >= threshold
+                if not admitting:
+                    keep = scores + remaining >= threshold
+                    candidates, scores = candidates[keep], scores[keep]
+
+        order = self.top_k_indices(scores[np.newaxis, :], top_k)[0]
+        top_indices, top_scores = candidates[order], scores[order]
+        if len(top_indices) < top_k:
+            # Fewer matching documents than top_k: pad with zero-score documents like a full scan would
+            padding = np.setdiff1d(np.arange(top_k + len(candidates)), candidates)[:top_k - len(top_indices)]
+            top_indices = np.concatenate([top_indices, padding])
+            top_scores = np.concatenate([top_scores, np.zeros(len(padding))])
+
+        return {
+            'indices': top_indices.tolist(),
+            'scores': top_scores.tolist()
+        }
+
+    @staticmethod
+    def _merge_postings(candidates, scores, docs, contributions):
+        """Add one term's postings to the candidates, admitting the documents not seen yet."""
+        merged, slots = np.unique(np.concatenate([candidates, docs]), return_inverse=True)
+        return merged, np.bincount(slots, weights=np.concatenate([scores, contributions]), minlength=len(merged))
+
+    @staticmethod
+    def _add_to_candidates(candidates, scores, docs, contributions):
+        """Add one term's postings to the candidates it contains, binary-searching the shorter list in the longer."""
+        if not len(candidates) or not len(docs):
+            return
+        if len(docs) <= len(candidates):
+            slots = np.minimum(np.searchsorted(candidates, docs), len(candidates) - 1)
+            hit = candidates[slots] == docs
+            scores[slots[hit]] += contributions[hit]
+        else:
+            slots = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[slots] == candidates
+            scores[hit] += contributions[slots[hit]]
+
+def get_retriever(method, **kwargs):
     retrievers = {
         'tfidf': TFIDFRetriever,
-        'cosine': CosineRetriever
+        'cosine': CosineRetriever,
+        'bm25': BM25Retriever,
+        'inverted': InvertedIndexRetriever
     }
     
+    if method == 'dense':
+        # Imported on demand: the dense retriever pulls in torch/transformers when it encodes
+        from .dense import DenseRetriever
+        retrievers['dense'] = DenseRetriever
+    elif method == 'hybrid':
+        from .hybrid import HybridRetriever
+        retrievers['hybrid'] = HybridRetriever
+    
     if method not in retrievers:
         raise ValueError(f"Unsupported retrieval method: {method}")
         
-    return retrievers[method]()
\ No newline at end of file
+    return retrievers[method](**kwargs)
\ No newline at end of file
@@ -0,0 +1,168 @@
+# TIDES/src/retrieval/tokenizer.py
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+import unicodedata
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['_\-][^\W_]+)*")
+
+def strip_accents(text: str) -> str:
+    """NFKD-decompose and drop combining marks ('café' -> 'cafe'), like sklearn's strip_accents='unicode'."""
+    if text.isascii():
+        return text
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+def regex_tokenize(text: str) -> List[str]:
+    """Tokenize lowercased text with a single compiled regex (no punkt model needed).
+
+    Accents are stripped first and any Unicode letter or digit counts as a word
+    character, so non-ASCII words stay whole.
+    """
+    return TOKEN_PATTERN.findall(strip_accents(text))
+
+def nltk_tokenize(text: str) -> List[str]:
+    import nltk
+    return nltk.word_tokenize(text)
+
+def _nltk_data_dirs() -> List[Path]:
+    """NLTK's default search path, without importing nltk."""
+    dirs = [d for d in os.environ.get('NLTK_DATA', '').split(os.pathsep) if d]
+    dirs.append(os.path.expanduser('~/nltk_data'))
+    for prefix in (sys.prefix, '/usr', '/usr/local'):
+        dirs.extend(os.path.join(prefix, sub) for sub in ('nltk_data', 'share/nltk_data', 'lib/nltk_data'))
+    return [Path(d) for d in dirs]
+
+def _read_nltk_resource(resource: str) -> Optional[str]:
+    """Text of an installed NLTK data file such as 'corpora/stopwords/english', or None."""
+    category, package, name = resource.split('/', 2)
+    for data_dir in _nltk_data_dirs():
+        path = data_dir / resource
+        if path.is_file():
+            return path.read_text(encoding='utf-8')
+        archive = data_dir / category / f'{package}.zip'
+        if archive.is_file():
+            with zipfile.ZipFile(archive) as zf:
+                try:
+                    return zf.read(f'{package}/{name}').decode('utf-8')
+                except KeyError:
+                    continue
+    return None
+
+@functools.lru_cache(maxsize=None)
+def ensure_nltk_resource(package: str, resource: str) -> None:
+    """Download an NLTK package only when it is not installed locally; checked once per process."""
+    category, name = resource.split('/', 1)
+    if any((d / resource).exists() or (d / category / f'{name}.zip').exists() for d in _nltk_data_dirs()):
+        return
+    import nltk
+    logging.getLogger(__name__).info(f"NLTK resource {resource} not found locally, downloading {package}")
+    nltk.download(package, quiet=True)
+
+@functools.lru_cache(maxsize=None)
+def english_stopwords() -> FrozenSet[str]:
+    """NLTK's English stopword list, read straight from nltk_data (no nltk import) once per process."""
+    text = _read_nltk_resource('corpora/stopwords/english')
+    if text is None:
+        ensure_nltk_resource('stopwords', 'corpora/stopwords')
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    return frozenset(line.strip() for line in text.splitlines() if line.strip())
+
+_SKLEARN_ANALYZER = None
+
+def _sklearn_analyzer():
+    global _SKLEARN_ANALYZER
+    if _SKLEARN_ANALYZER is None:
+        from sklearn.feature_extraction.text import CountVectorizer
+        _SKLEARN_ANALYZER = CountVectorizer().build_tokenizer()
+    return _SKLEARN_ANALYZER
+
+def sklearn_tokenize(text: str) -> List[str]:
+    return _sklearn_analyzer()(text)
+
+TOKENIZERS: Dict[str, Callable[[str], List[str]]] = {
+    'regex': regex_tokenize,
+    'nltk': nltk_tokenize,
+    'sklearn': sklearn_tokenize
+}
+
+# Bumped when a tokenizer's output changes, so on-disk caches keyed by tokenizer are rebuilt
+TOKENIZER_VERSIONS: Dict[str, int] = {'regex': 2}
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    if name not in TOKENIZERS:
+        raise ValueError(f"Unsupported tokenizer: {name}")
+    return TOKENIZERS[name]
+
+def tokenizer_key(name: str) -> str:
+    """Tokenizer name plus output version, for keying persisted preprocess, index and retrieval caches."""
+    version = TOKENIZER_VERSIONS.get(name)
+    return f'{name}-v{version}' if version else name
+
+class PreprocessCache:
+    """Content-hash keyed cache of normalized texts, optionally persisted as a pickle.
+
+    Keys are the SHA-1 of the raw text, so a corpus section is normalized at most
+    once per process (and once overall when ``cache_path`` is set and saved).
+    """
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.entries: Dict[str, str] = {}
+        self.dirty = False
+        self.logger = logging.getLogger(__name__)
+        self._load()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, text: str, compute: Callable[[str], str]) -> str:
+        key = self.key(text)
+        value = self.entries.get(key)
+        if value is None:
+            value = compute(text)
+            self.entries[key] = value
+            self.dirty = True
+        return value
+
+    def _load(self) -> None:
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                self.entries = pickle.load(f)
+            self.logger.info(f"Loaded {len(self.entries)} preprocessed texts from {self.cache_path}")
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable preprocess cache {self.cache_path}: {str(e)}")
+            self.entries = {}
+
+    def save(self) -> None:
+        if self.cache_path is None or not self.dirty:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(self.cache_path)
+            self.dirty = False
+        except Exception as e:
+            self.logger.warning(f"Could not save preprocess cache: {str(e)}")
+
+_CACHES: Dict[tuple, PreprocessCache] = {}
+
+def get_preprocess_cache(tokenizer: str, cache_dir: Optional[Path] = None) -> PreprocessCache:
+    """Return the process-wide cache for a tokenizer, shared by every retriever instance."""
+    cache_path = Path(cache_dir) / f'preprocess_{tokenizer_key(tokenizer)}.pkl' if cache_dir else None
+    key = (tokenizer, str(cache_path))
+    if key not in _CACHES:
+        _CACHES[key] = PreprocessCache(cache_path)
+    return _CACHES[key]
@@ -4,5 +4,10 @@ Utility functions and classes for TIDES
 """
 from .model_manager import ModelManager
 from .config import ConfigManager
+from .response_cache import ResponseCache
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .scheduler import run_ordered
+from .result_store import ResultStore, iter_run_results
 
-__all__ = ['ModelManager', 'ConfigManager']
\ No newline at end of file
+__all__ = ['ModelManager', 'ConfigManager', 'ResponseCache', 'RateLimiter', 'get_rate_limiter', 'run_ordered',
+           'ResultStore', 'iter_run_results']
\ No newline at end of file
@@ -0,0 +1,148 @@
+# TIDES/src/utils/checkpoint.py
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+MANIFEST_NAME = 'run_manifest.json'
+
+# Settings that decide what a run produces. Anything else (API keys, caches, rate limits,
+# concurrency, streaming, output paths, metrics) only changes how fast a run goes or where
+# it writes, so it is left out of the hash and can change between resumes. The dataset and
+# the model that actually runs are hashed alongside these (see config_hash).
+RESULT_KEYS = [
+    ('model', 'type'),
+    ('model', 'name'),
+    ('model', 'max_tokens'),
+    ('model', 'temperature'),
+    ('retrieval', 'method'),
+    ('retrieval', 'top_k'),
+    ('retrieval', 'tokenizer'),
+    ('evaluation', 'context'),
+    ('evaluation', 'min_retrieval_score'),
+    ('evaluation', 'relevance_batch_size'),
+    ('evaluation', 'relevance_batch_tokens'),
+    ('evaluation', 'segmentation'),
+    ('evaluation', 'system_prompts')
+]
+
+# Option sections under retrieval that configure each retriever (hybrid also builds the dense one)
+RETRIEVER_OPTION_KEYS = {'hybrid': ['hybrid', 'dense']}
+
+class ManifestMismatchError(RuntimeError):
+    pass
+
+def _lookup(config: Dict[str, Any], path) -> Any:
+    node = config
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+def config_hash(config: Dict[str, Any], dataset: str, model=None) -> str:
+    """Stable hash of the result-affecting part of a run (dataset, RESULT_KEYS and the retriever's options).
+
+    With a ModelManager, its effective model type and name (after defaults) replace the
+    config's, which leaves model.name unset unless --model-name or a config file sets it.
+    """
+    relevant = {'.'.join(path): _lookup(config, path) for path in RESULT_KEYS}
+    relevant['dataset'] = dataset
+    if model is not None:
+        relevant['model.type'] = model.model_type
+        relevant['model.name'] = model.model_name
+    method = _lookup(config, ('retrieval', 'method'))
+    for section in RETRIEVER_OPTION_KEYS.get(method, [method]):
+        relevant[f'retrieval.{section}'] = _lookup(config, ('retrieval', section))
+    payload = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def run_id_for(config: Dict[str, Any], dataset: str, model=None) -> str:
+    """Run key in the results store; stable across resumes of the same configuration."""
+    return f'{dataset}_{config_hash(config, dataset, model)[:12]}'
+
+def result_path(save_dir: Path, idx: int) -> Path:
+    return Path(save_dir) / f'result_{idx:03d}.json'
+
+def is_valid_result(path: Path) -> bool:
+    try:
+        with open(path, 'r') as f:
+            result = json.load(f)
+        return isinstance(result, dict) and 'stage3' in result
+    except (OSError, ValueError):
+        return False
+
+def pending_indices(save_dir: Path, indices: Iterable[int], store=None, run_id: str = None) -> List[int]:
+    """Indices whose result is missing from the results store, or whose result file is missing or corrupt."""
+    if store is not None:
+        # Store rows are committed whole, so presence means a finished result
+        done = set(store.indices(run_id))
+        return [idx for idx in indices if idx not in done]
+    logger = logging.getLogger(__name__)
+    pending = []
+    for idx in indices:
+        path = result_path(save_dir, idx)
+        if not path.exists():
+            pending.append(idx)
+        elif not is_valid_result(path):
+            logger.warning(f"Result {path} is corrupt and will be recomputed")
+            pending.append(idx)
+    return pending
+
+def load_manifest(save_dir: Path) -> Dict[str, Any]:
+    path = Path(save_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_manifest(save_dir: Path, config: Dict[str, Any], dataset: str, model=None) -> Dict[str, Any]:
+    save_dir = Path(save_dir)
+    save_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        'config_hash': config_hash(config, dataset, model),
+        'run_id': run_id_for(config, dataset, model),
+        'dataset': dataset,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    tmp_path = save_dir / f'{MANIFEST_NAME}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    tmp_path.replace(save_dir / MANIFEST_NAME)
+    return manifest
+
+def _manifest_mismatch(manifest: Dict[str, Any], config: Dict[str, Any], dataset: str, model=None) -> str:
+    """Why an existing manifest does not describe this run, or '' when it does (or there is none)."""
+    if not manifest:
+        return ''
+    if manifest.get('dataset') != dataset:
+        return f"dataset {manifest.get('dataset')}, current {dataset}"
+    current = config_hash(config, dataset, model)
+    if manifest.get('config_hash') != current:
+        return f"manifest {manifest.get('config_hash', '')[:12]}, current {current[:12]}"
+    return ''
+
+def check_manifest(save_dir: Path, config: Dict[str, Any], dataset: str, model=None) -> None:
+    """Refuse to resume into a directory produced by a different dataset or configuration."""
+    mismatch = _manifest_mismatch(load_manifest(save_dir), config, dataset, model)
+    if mismatch:
+        raise ManifestMismatchError(
+            f"Results in {save_dir} were produced with a different configuration ({mismatch}). "
+            f"Use a different --output-dir or rerun without --resume."
+        )
+
+def check_fresh_run(save_dir: Path, config: Dict[str, Any], dataset: str, model=None) -> None:
+    """Refuse to re-stamp a directory whose result_NNN.json files belong to a different configuration.
+
+    Legacy json results carry no run id, so once the manifest is rewritten a later
+    --resume would accept them. Store rows are keyed by run id and need no check.
+    """
+    save_dir = Path(save_dir)
+    mismatch = _manifest_mismatch(load_manifest(save_dir), config, dataset, model)
+    if mismatch and any(save_dir.glob('result_*.json')):
+        raise ManifestMismatchError(
+            f"{save_dir} holds result files from a different configuration ({mismatch}). "
+            f"Use a different --output-dir or remove them first."
+        )
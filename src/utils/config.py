@@ -10,12 +10,20 @@ class ConfigManager:
 
     def _load_config(self):
         config = self._load_default_config()
-        config.update(self._load_dataset_config())
+        self._merge(config, self._load_dataset_config())
         if self.args.config:
-            config.update(self._load_custom_config())
-        config.update(self._get_args_config())
+            self._merge(config, self._load_custom_config())
+        self._merge(config, self._get_args_config())
         return config
 
+    def _merge(self, base, override):
+        for key, value in (override or {}).items():
+            if isinstance(value, dict) and isinstance(base.get(key), dict):
+                self._merge(base[key], value)
+            else:
+                base[key] = value
+        return base
+
     def _load_default_config(self):
         default_path = Path('config/default_config.yaml')
         if not default_path.exists():
@@ -50,10 +58,12 @@ class ConfigManager:
         
         if self.args.model_name:
             args_config['model']['name'] = self.args.model_name
-        if self.args.top_k:
+        if getattr(self.args, 'top_k', None):
             args_config['retrieval']['top_k'] = self.args.top_k
+        if getattr(self.args, 'cache_mode', None):
+            args_config['model']['cache'] = {'mode': self.args.cache_mode}
         if self.args.output_dir:
-            args_config['data']['output_dir'] = self.args.output_dir
+            args_config['output'] = {'save_dir': self.args.output_dir}
             
         return args_config
 
@@ -1,33 +1,116 @@
 # TIDES/src/utils/model_manager.py
-from together import Together
-from openai import OpenAI
+import logging
+import threading
+import time
+
+from .rate_limiter import backoff_delay, parse_retry_after
+
+NON_RETRYABLE_STATUS = {400, 401, 403, 404, 422}
+# Completion tokens reserved for a stage before any of its replies has been seen
+DEFAULT_COMPLETION_ESTIMATE = 256
 
 class ModelManager:
-    def __init__(self, model_type, api_key, model_name=None):
+    def __init__(self, model_type, api_key, model_name=None, cache=None, rate_limiter=None,
+                 backoff_base=1.0, backoff_max=60.0, max_in_flight=None):
         self.model_type = model_type
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Global cap on concurrent API calls across all questions and stages
+        self.in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+        self.temperature = 0
+        # Running mean of observed completion tokens per stage, used to size rate-limit reservations
+        self._completion_tokens = {}
+        self._usage_lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        # Provider SDKs are imported on demand so only the selected one is loaded
         if model_type == 'together':
+            from together import Together
             self.client = Together(api_key=api_key)
             self.model_name = model_name or "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
         elif model_type == 'openai':
+            from openai import OpenAI
             self.client = OpenAI(api_key=api_key)
             self.model_name = model_name or "gpt-3.5-turbo-0125"
 
-    def call_with_retry(self, message, max_tokens=1000, max_retries=5):
+    def call_with_retry(self, message, max_tokens=1000, max_retries=5, stage=None):
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(self.model_type, self.model_name, message, max_tokens, self.temperature)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if self.in_flight is not None:
+            with self.in_flight:
+                response = self._call_api(message, max_tokens, max_retries, stage)
+        else:
+            response = self._call_api(message, max_tokens, max_retries, stage)
+        if cache_key is not None:
+            self.cache.put(cache_key, response)
+        return response
+
+    def _call_api(self, message, max_tokens, max_retries, stage=None):
+        # message is either a plain user prompt or a ready-made chat message list
+        messages = message if isinstance(message, list) else [{"role": "user", "content": message}]
         for attempt in range(max_retries):
+            reserved = 0
+            if self.rate_limiter is not None:
+                reserved = self._estimate_tokens(message) + self._completion_estimate(stage, max_tokens)
+                self.rate_limiter.acquire(reserved)
             try:
                 if self.model_type == 'together':
                     response = self.client.chat.completions.create(
                         model=self.model_name,
-                        messages=[{"role": "user", "content": message}],
-                        temperature=0,
+                        messages=messages,
+                        temperature=self.temperature,
                         max_tokens=max_tokens
                     )
                 else:  # openai
                     response = self.client.chat.completions.create(
                         model=self.model_name,
-                        messages=[{"role": "user", "content": message}],
-                        temperature=0
+                        messages=messages,
+                        temperature=self.temperature
                     )
+                self._record_usage(response, stage, reserved)
                 return response.choices[0].message.content
             except Exception as e:
-                self._handle_error(e, attempt, max_retries)
\ No newline at end of file
+                self._handle_error(e, attempt, max_retries)
+
+    def _completion_estimate(self, stage, max_tokens):
+        with self._usage_lock:
+            estimate = self._completion_tokens.get(stage, DEFAULT_COMPLETION_ESTIMATE)
+        return min(int(estimate), max_tokens)
+
+    def _record_usage(self, response, stage, reserved):
+        """Settle the rate-limit reservation against the provider's reported usage."""
+        usage = getattr(response, 'usage', None)
+        completion_tokens = getattr(usage, 'completion_tokens', None)
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if completion_tokens is not None:
+            with self._usage_lock:
+                previous = self._completion_tokens.get(stage)
+                self._completion_tokens[stage] = (
+                    completion_tokens if previous is None else 0.8 * previous + 0.2 * completion_tokens
+                )
+        if self.rate_limiter is not None and reserved and total_tokens is not None:
+            self.rate_limiter.settle(reserved, total_tokens)
+
+    @staticmethod
+    def _estimate_tokens(message):
+        # Roughly four characters per token; only used to size the tokens/min reservation
+        return len(str(message)) // 4
+
+    def _handle_error(self, error, attempt, max_retries):
+        status = getattr(error, 'status_code', None)
+        if status in NON_RETRYABLE_STATUS or attempt >= max_retries - 1:
+            raise error
+
+        retry_after = parse_retry_after(error)
+        if retry_after is not None and self.rate_limiter is not None:
+            self.rate_limiter.pause(retry_after)
+        wait_time = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+        self.logger.warning(f"Attempt {attempt + 1}/{max_retries} failed ({str(error)[:200]}). "
+                            f"Retrying in {wait_time:.1f} seconds...")
+        time.sleep(wait_time)
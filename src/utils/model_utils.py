@@ -1,9 +1,10 @@
 # TIDES/src/utils/model_utils.py
 import os
 import time
-import re
 from together import Together
 
+from .rate_limiter import backoff_delay, parse_retry_after
+
 class ModelManager:
     def __init__(self, api_key):
         os.environ['TOGETHER_API_KEY'] = api_key
@@ -24,17 +25,10 @@ class ModelManager:
                 self._handle_api_error(e, attempt, max_retries)
 
     def _handle_api_error(self, error, attempt, max_retries):
-        error_message = str(error)
-        wait_time = self._get_wait_time(error_message)
+        wait_time = backoff_delay(attempt, retry_after=parse_retry_after(error))
         
         if attempt < max_retries - 1:
-            print(f"Attempt {attempt + 1}/{max_retries} failed. Waiting {wait_time} seconds...")
+            print(f"Attempt {attempt + 1}/{max_retries} failed. Waiting {wait_time:.1f} seconds...")
             time.sleep(wait_time)
         else:
             raise error
-
-    def _get_wait_time(self, error_message):
-        if "rate_limit_exceeded" in error_message.lower():
-            wait_time_match = re.search(r"Please try again in (\d+\.?\d*)s", error_message)
-            return float(wait_time_match.group(1)) if wait_time_match else 60
-        return 60
\ No newline at end of file
@@ -0,0 +1,105 @@
+# TIDES/src/utils/rate_limiter.py
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``per_minute`` units per minute.
+
+    Callers reserve capacity up front and sleep off any deficit, so concurrent
+    workers are spaced out evenly instead of polling.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take ``amount`` units and return how many seconds the caller must wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= min(amount, self.capacity)
+            return 0.0 if self.available >= 0 else -self.available / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return ``amount`` units of an earlier reservation; a negative amount charges extra."""
+        with self._lock:
+            self.available = min(self.capacity, self.available + amount)
+
+class RateLimiter:
+    """Client-side requests/min and tokens/min limiter shared by every worker of a provider."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until one request of roughly ``tokens`` tokens fits the quota; returns the time waited."""
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket is not None and tokens:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Correct a tokens/min reservation once the provider reports the tokens actually used."""
+        if self.token_bucket is not None and reserved:
+            capacity = self.token_bucket.capacity
+            self.token_bucket.refund(min(reserved, capacity) - min(used, capacity))
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all workers for ``seconds``, e.g. after the provider sent Retry-After."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_rate_limiter(provider: str, requests_per_minute: Optional[float] = None,
+                     tokens_per_minute: Optional[float] = None) -> Optional[RateLimiter]:
+    """Return the process-wide limiter for a provider, creating it on first use."""
+    if not requests_per_minute and not tokens_per_minute:
+        return None
+    with _LIMITERS_LOCK:
+        if provider not in _LIMITERS:
+            _LIMITERS[provider] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return _LIMITERS[provider]
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After headers or the error message."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+
+    match = re.search(r"try again in (\d+\.?\d*)\s*(ms|s)", str(error), re.IGNORECASE)
+    if match:
+        value = float(match.group(1))
+        return value / 1000.0 if match.group(2).lower() == 'ms' else value
+    return None
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0,
+                  retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter; a provider Retry-After takes precedence."""
+    if retry_after is not None:
+        return min(retry_after, maximum) + random.uniform(0, base)
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
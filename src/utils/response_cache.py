@@ -0,0 +1,138 @@
+# TIDES/src/utils/response_cache.py
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+class ResponseCache:
+    """Persistent SQLite cache of LLM responses keyed by a hash of the request.
+
+    Modes:
+        readwrite: serve hits and store new responses (default)
+        readonly:  serve hits but never write
+        bypass:    neither read nor write (always call the API)
+
+    Eviction is least-recently-used once ``max_entries`` or ``max_bytes`` is exceeded.
+    Entry and byte totals are read once on open and kept up to date by this instance,
+    so inserts never rescan the table. A readonly cache opens the database with
+    SQLite's ``mode=ro`` and runs no DDL, so it works on read-only mounts.
+    """
+    MODES = ('readwrite', 'readonly', 'bypass')
+
+    def __init__(self, path, mode: str = 'readwrite', max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._entries = 0
+        self._bytes = 0
+        if mode == 'readonly':
+            self._connect_readonly()
+        elif mode == 'readwrite':
+            self._connect()
+
+    def _connect_readonly(self) -> None:
+        try:
+            self._conn = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True, check_same_thread=False)
+            self._conn.execute('SELECT 1 FROM responses LIMIT 1')
+        except sqlite3.Error as e:
+            self.logger.warning(f"Response cache {self.path} is not readable, serving no hits: {str(e)}")
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+
+    def _connect(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        if self.max_entries is not None or self.max_bytes is not None:
+            self._entries, self._bytes = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()
+
+    @staticmethod
+    def make_key(model_type: str, model_name: str, prompt: Any, max_tokens: int, temperature: float) -> str:
+        payload = json.dumps([model_type, model_name, prompt, max_tokens, temperature],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.mode == 'readwrite':
+                self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        if self._conn is None or self.mode != 'readwrite' or response is None:
+            return
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            replaced = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, response, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, response, size, now, now)
+            )
+            if replaced is None:
+                self._entries += 1
+            else:
+                self._bytes -= replaced[0]
+            self._bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        if self.max_entries is not None and self._entries > self.max_entries:
+            self._evict_oldest(self._entries - self.max_entries)
+        if self.max_bytes is not None:
+            while self._bytes > self.max_bytes and self._entries > 0:
+                if not self._evict_oldest(1):
+                    break
+
+    def _evict_oldest(self, count: int) -> int:
+        rows = self._conn.execute(
+            'SELECT key, size FROM responses ORDER BY last_access ASC LIMIT ?', (count,)
+        ).fetchall()
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', [(row[0],) for row in rows])
+        self._entries -= len(rows)
+        self._bytes -= sum(row[1] for row in rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,150 @@
+# TIDES/src/utils/result_store.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .checkpoint import load_manifest
+
+RESULTS_DB = 'results.sqlite'
+
+class ResultStore:
+    """Append-only SQLite store of per-question results keyed by (run_id, question index).
+
+    Results are kept as zlib-compressed compact JSON. Appends are buffered and written
+    as one transaction every ``commit_every`` results (and on flush/close), so each
+    batch lands atomically. A crash loses at most the uncommitted tail and never leaves
+    a half-written result. ``sync`` sets the SQLite synchronous level for the WAL:
+        full:   fsync on every commit
+        normal: fsync at WAL checkpoints (default; a commit can be lost on power
+                failure, never corrupted)
+        off:    leave flushing to the OS
+    Writing a result again for the same (run_id, index) replaces it, which is how a
+    recomputed question supersedes a failed one.
+    """
+    SYNC_LEVELS = ('off', 'normal', 'full')
+
+    def __init__(self, path, commit_every: int = 16, sync: str = 'normal', readonly: bool = False):
+        if sync not in self.SYNC_LEVELS:
+            raise ValueError(f"Unsupported sync level: {sync}")
+        self.path = Path(path)
+        self.commit_every = max(1, commit_every)
+        self.readonly = readonly
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, int, bytes, float]] = []
+        if readonly:
+            self._conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(f'PRAGMA synchronous={sync.upper()}')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                'run_id TEXT NOT NULL, idx INTEGER NOT NULL, data BLOB NOT NULL, created REAL NOT NULL, '
+                'PRIMARY KEY (run_id, idx)) WITHOUT ROWID'
+            )
+
+    @staticmethod
+    def exists(save_dir: Path) -> bool:
+        return (Path(save_dir) / RESULTS_DB).exists()
+
+    @staticmethod
+    def _encode(result: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    @staticmethod
+    def _decode(data: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def append(self, run_id: str, idx: int, result: Dict[str, Any]) -> None:
+        record = (run_id, idx, self._encode(result), time.time())
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) >= self.commit_every:
+                self._commit()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._pending:
+            return
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO results (run_id, idx, data, created) VALUES (?, ?, ?, ?)',
+                self._pending
+            )
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        self.logger.debug(f"Committed {len(self._pending)} results to {self.path}")
+        self._pending = []
+
+    def get(self, run_id: str, idx: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM results WHERE run_id = ? AND idx = ?', (run_id, idx)
+            ).fetchone()
+        return None if row is None else self._decode(row[0])
+
+    def indices(self, run_id: str) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT idx FROM results WHERE run_id = ? ORDER BY idx', (run_id,)
+            )]
+
+    def runs(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT run_id FROM results ORDER BY run_id')]
+
+    def iter_results(self, run_id: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(index, result) pairs in index order, decoded one row at a time."""
+        cursor = self._conn.execute('SELECT idx, data FROM results WHERE run_id = ? ORDER BY idx', (run_id,))
+        for idx, data in cursor:
+            yield idx, self._decode(data)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                if not self.readonly:
+                    self._commit()
+                self._conn.close()
+                self._conn = None
+
+def iter_run_results(save_dir: Path, run_id: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (index, result) for a results directory, from its store or from legacy result_NNN.json files.
+
+    The run defaults to the one recorded in the directory's manifest, or the store's
+    only run when there is no manifest.
+    """
+    save_dir = Path(save_dir)
+    if ResultStore.exists(save_dir):
+        store = ResultStore(save_dir / RESULTS_DB, readonly=True)
+        try:
+            run_id = run_id or load_manifest(save_dir).get('run_id')
+            if run_id is None:
+                runs = store.runs()
+                if len(runs) > 1:
+                    raise ValueError(f"{save_dir / RESULTS_DB} holds several runs {runs}; pass a run id")
+                run_id = runs[0] if runs else ''
+            yield from store.iter_results(run_id)
+        finally:
+            store.close()
+        return
+
+    for path in sorted(save_dir.glob('result_*.json')):
+        try:
+            idx = int(path.stem[len('result_'):])
+            with open(path, 'r') as f:
+                yield idx, json.load(f)
+        except (ValueError, OSError) as e:
+            logging.getLogger(__name__).warning(f"Skipping unreadable result {path}: {str(e)}")
@@ -0,0 +1,38 @@
+# TIDES/src/utils/scheduler.py
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List
+
+def run_ordered(indices: List[int], worker: Callable[[int], Any], sink: Callable[[int, Any], None],
+                max_workers: int = 1) -> int:
+    """Run worker(idx) for every index on up to max_workers threads, handing results to sink in index order.
+
+    A result is buffered until every earlier index has been written, so the output
+    sequence matches a sequential run. Workers returning None (failed questions)
+    are skipped. Returns the number of results written.
+    """
+    logger = logging.getLogger(__name__)
+    written = 0
+    if max_workers <= 1:
+        for idx in indices:
+            result = worker(idx)
+            if result is not None:
+                sink(idx, result)
+                written += 1
+        return written
+
+    position = {idx: pos for pos, idx in enumerate(indices)}
+    buffered: Dict[int, Any] = {}
+    next_pos = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(worker, idx): idx for idx in indices}
+        for future in as_completed(futures):
+            buffered[position[futures[future]]] = future.result()
+            while next_pos in buffered:
+                result = buffered.pop(next_pos)
+                if result is not None:
+                    sink(indices[next_pos], result)
+                    written += 1
+                next_pos += 1
+            logger.debug(f"{next_pos}/{len(indices)} questions written, {len(buffered)} buffered")
+    return written